@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_CACHE_KEY = 'auth_user:{user_id}'
+# Cached users are pickled model instances; bump this when CustomUser's
+# fields change so a deploy never reads entries of the old shape.
+USER_CACHE_VERSION = 1
+
+
+def _user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id=user_id)
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(_user_cache_key(user_id), version=USER_CACHE_VERSION)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that keeps the authenticated user in the cache
+    for ``AUTH_USER_CACHE_TIMEOUT`` seconds instead of loading it on every
+    request. Saving or deleting a user drops the entry (see
+    ``account.signals``); ``QuerySet.update()`` on users does not.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = _user_cache_key(user_id)
+        user = cache.get(key, version=USER_CACHE_VERSION)
+        if user is None:
+            # Checks is_active and the revoke claim; only users that pass are cached.
+            user = super().get_user(validated_token)
+            cache.set(key, user, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60), version=USER_CACHE_VERSION)
+        elif api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return user
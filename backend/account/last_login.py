@@ -0,0 +1,85 @@
+"""
+Write-behind buffer for ``last_login``.
+
+Issuing tokens records the login time in memory instead of updating the
+user row right away. A background thread writes everything buffered every
+``LAST_LOGIN_FLUSH_INTERVAL`` seconds with one batched UPDATE, and once
+more when the process exits, so a burst of logins costs a handful of
+writes instead of one per login. A crash loses at most one interval.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Users per UPDATE statement.
+LAST_LOGIN_BATCH_SIZE = 200
+
+
+class LastLoginBuffer:
+    def __init__(self, interval=None, background=True):
+        self.interval = interval
+        self.background = background
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, user_id, when):
+        with self._lock:
+            self._pending[user_id] = max(when, self._pending.get(user_id, when))
+            if self.background and self._thread is None:
+                self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='last-login-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        interval = self.interval or getattr(settings, 'LAST_LOGIN_FLUSH_INTERVAL', 10)
+        stopped = threading.Event()
+        while not stopped.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing last_login values failed')
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write the buffered values. Returns the number of users updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        items = sorted(pending.items())
+        try:
+            for start in range(0, len(items), LAST_LOGIN_BATCH_SIZE):
+                batch = items[start:start + LAST_LOGIN_BATCH_SIZE]
+                get_user_model().objects.filter(pk__in=[user_id for user_id, _ in batch]).update(
+                    last_login=Case(
+                        *(When(pk=user_id, then=Value(when)) for user_id, when in batch),
+                        output_field=DateTimeField(),
+                    )
+                )
+        except Exception:
+            # Keep the values for the next flush unless newer ones arrived.
+            with self._lock:
+                for user_id, when in pending.items():
+                    self._pending[user_id] = max(when, self._pending.get(user_id, when))
+            raise
+        return len(items)
+
+
+last_logins = LastLoginBuffer()
+
+
+def record_login(user):
+    """Set ``user.last_login`` to now; the database row follows on the next flush."""
+    user.last_login = timezone.now()
+    last_logins.record(user.pk, user.last_login)
@@ -0,0 +1,228 @@
+"""
+Provider calls for social login, made with one pooled ``httpx.AsyncClient``
+per event loop. The app is served over ASGI only (see ``backend.wsgi``), so
+that is a single client for the process, closed at lifespan shutdown, and
+logins reuse kept-alive connections to the providers.
+
+Google ID tokens are verified locally against Google's signing keys,
+which are cached for as long as their ``Cache-Control`` allows, so such
+logins usually make no outbound call at all.
+"""
+import asyncio
+import hmac
+import re
+import secrets
+import time
+import weakref
+
+import httpx
+import jwt
+from django.core.cache import cache
+
+HTTP_TIMEOUT = httpx.Timeout(10.0)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+# Retries cover failed connection attempts only.
+HTTP_RETRIES = 2
+
+# Used when the JWKS response carries no max-age.
+JWKS_DEFAULT_MAX_AGE = 3600
+# Least time between refreshes caused by tokens with an unknown ``kid``.
+JWKS_MIN_REFRESH_INTERVAL = 60
+
+# The Google nonce is issued by the server in a signed HttpOnly cookie
+# and can be used for one login within this many seconds.
+NONCE_COOKIE = "google_oauth_nonce"
+NONCE_SALT = "account.oauth.nonce"
+NONCE_MAX_AGE = 600
+
+_clients = weakref.WeakKeyDictionary()
+_jwks = {}
+
+
+class OAuthError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_http_client():
+    """The pooled client of the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            transport=httpx.AsyncHTTPTransport(limits=HTTP_LIMITS, retries=HTTP_RETRIES),
+        )
+    return client
+
+
+async def close_http_client():
+    """Close the running loop's client, e.g. on shutdown."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def exchange_github_code(conf, code):
+    try:
+        response = await get_http_client().post(
+            conf["token_url"],
+            headers={"Accept": "application/json"},
+            data={"client_id": conf["client_id"], "client_secret": conf["client_secret"], "code": code},
+        )
+        token_data = response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        raise OAuthError(f"GitHub token exchange failed: {e}", status=500)
+    access_token = token_data.get("access_token")
+    if not access_token:
+        raise OAuthError(f"Failed to get access token: {token_data}")
+    return access_token
+
+
+def _userinfo(response):
+    if isinstance(response, Exception):
+        raise OAuthError(f"Failed to fetch user info: {response}", status=500)
+    if response.status_code != 200:
+        raise OAuthError("Invalid access token")
+    try:
+        return response.json()
+    except ValueError as e:
+        raise OAuthError(f"Failed to fetch user info: {e}", status=500)
+
+
+async def fetch_github_profile(conf, access_token):
+    """``(email, username)`` of a GitHub user; userinfo and emails are fetched concurrently."""
+    client = get_http_client()
+    # GitHub uses the "token" prefix instead of "Bearer".
+    headers = {"Authorization": f"token {access_token}", "Accept": "application/json"}
+    userinfo, emails = await asyncio.gather(
+        client.get(conf["userinfo_url"], headers=headers),
+        client.get(conf["email_url"], headers=headers),
+        return_exceptions=True,
+    )
+    data = _userinfo(userinfo)
+    email = data.get("email")
+    if not email:
+        # Only needed when the profile email is private.
+        try:
+            if isinstance(emails, Exception):
+                raise emails
+            email = next((e["email"] for e in emails.json() if e.get("primary")), None)
+        except (httpx.HTTPError, ValueError, TypeError, KeyError) as e:
+            raise OAuthError(f"Failed to fetch email: {e}", status=500)
+    return email, str(data.get("login"))
+
+
+async def fetch_google_profile(conf, access_token):
+    """``(email, username)`` of a Google user, from the userinfo endpoint."""
+    try:
+        response = await get_http_client().get(
+            conf["userinfo_url"], headers={"Authorization": f"Bearer {access_token}"},
+        )
+    except httpx.HTTPError as e:
+        response = e
+    data = _userinfo(response)
+    return data.get("email"), data.get("sub")
+
+
+def _max_age(cache_control):
+    if re.search(r"\b(no-store|no-cache)\b", cache_control or ""):
+        return 0
+    match = re.search(r"\bmax-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else JWKS_DEFAULT_MAX_AGE
+
+
+class JWKSCache:
+    """The signing keys published at one JWKS URL, by ``kid``."""
+
+    def __init__(self, url):
+        self.url = url
+        self.keys = {}
+        self.fetched_at = None
+        self.expires_at = 0.0
+        # An asyncio lock can only be used from one event loop.
+        self.locks = weakref.WeakKeyDictionary()
+
+    def lock(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self.locks:
+            self.locks[loop] = asyncio.Lock()
+        return self.locks[loop]
+
+    def _stale(self, kid):
+        now = time.monotonic()
+        # A new kid means the keys were rotated, but don't let arbitrary
+        # tokens force a fetch on every request.
+        rotated = kid not in self.keys and (
+            self.fetched_at is None or now - self.fetched_at >= JWKS_MIN_REFRESH_INTERVAL
+        )
+        return now >= self.expires_at or rotated
+
+    async def get_key(self, kid):
+        if self._stale(kid):
+            async with self.lock():
+                # Requests that queued up behind a refresh use its result.
+                if self._stale(kid):
+                    await self.refresh()
+        try:
+            return self.keys[kid]
+        except KeyError:
+            raise OAuthError("Invalid ID token: unknown signing key")
+
+    async def refresh(self):
+        try:
+            response = await get_http_client().get(self.url)
+            response.raise_for_status()
+            keys = {jwk["kid"]: jwt.PyJWK(jwk).key for jwk in response.json()["keys"]}
+        except (httpx.HTTPError, ValueError, KeyError, TypeError, jwt.PyJWKError) as e:
+            raise OAuthError(f"Failed to fetch signing keys: {e}", status=500)
+        self.keys = keys
+        self.fetched_at = time.monotonic()
+        self.expires_at = self.fetched_at + _max_age(response.headers.get("Cache-Control"))
+
+
+def get_jwks(url):
+    if url not in _jwks:
+        _jwks[url] = JWKSCache(url)
+    return _jwks[url]
+
+
+def new_nonce():
+    return secrets.token_urlsafe(32)
+
+
+async def consume_nonce(nonce):
+    """
+    Mark ``nonce`` used; False if it already was. The cache must be shared
+    by all workers for this to hold across processes.
+    """
+    return await cache.aadd(f"oauth-nonce:{nonce}", True, NONCE_MAX_AGE)
+
+
+async def verify_google_id_token(conf, id_token, nonce):
+    """
+    ``(email, username)`` from a Google ID token, checked against the cached
+    keys and the ``nonce`` issued to this browser in ``NONCE_COOKIE``. The
+    nonce is consumed, so a captured token cannot be replayed.
+    """
+    try:
+        kid = jwt.get_unverified_header(id_token).get("kid")
+    except jwt.InvalidTokenError as e:
+        raise OAuthError(f"Invalid ID token: {e}")
+    key = await get_jwks(conf["jwks_url"]).get_key(kid)
+    try:
+        claims = jwt.decode(
+            id_token, key, algorithms=["RS256"],
+            audience=conf["client_id"], issuer=conf["issuers"],
+            options={"require": ["exp", "iat", "iss", "aud", "sub"]},
+        )
+    except jwt.InvalidTokenError as e:
+        raise OAuthError(f"Invalid ID token: {e}")
+    if not nonce or not hmac.compare_digest(str(claims.get("nonce", "")), str(nonce)):
+        raise OAuthError("Invalid ID token: nonce mismatch")
+    if not await consume_nonce(nonce):
+        raise OAuthError("Invalid ID token: nonce already used")
+    if not claims.get("email_verified"):
+        raise OAuthError("Email not verified")
+    return claims.get("email"), claims["sub"]
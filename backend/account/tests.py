@@ -1,3 +1,400 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import json
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from asgiref.testing import ApplicationCommunicator
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.asgi import application
+
+from . import oauth
+from .last_login import LastLoginBuffer
+
+User = get_user_model()
+
+
+class StubOAuthHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.record(self)
+        self.reply(200, {'access_token': 'gh-token'})
+
+    def do_GET(self):
+        self.server.record(self)
+        if self.path == '/certs':
+            return self.reply(200, self.server.jwks(), {'Cache-Control': 'public, max-age=300'})
+        if self.path in ('/user', '/user/emails'):
+            # Both GitHub calls must be in flight together to pass the barrier.
+            try:
+                self.server.github_barrier.wait()
+            except threading.BrokenBarrierError:
+                return self.reply(500, {})
+        if self.headers.get('Authorization') not in ('token gh-token', 'Bearer google-token'):
+            return self.reply(401, {})
+        self.reply(200, self.server.responses[self.path])
+
+    def reply(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubOAuthServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubOAuthHandler)
+        self.github_barrier = threading.Barrier(2, timeout=2)
+        self.connections = set()
+        self.requests = Counter()
+        self.signing_keys = {}
+        self.responses = {
+            '/user': {'login': 'octocat', 'email': None},
+            '/user/emails': [{'email': 'other@example.com'}, {'email': 'octo@example.com', 'primary': True}],
+            '/userinfo': {'sub': '1234', 'email': 'g@example.com'},
+        }
+
+    def record(self, handler):
+        self.connections.add(handler.client_address)
+        self.requests[handler.path] += 1
+
+    def jwks(self):
+        keys = []
+        for kid, key in self.signing_keys.items():
+            jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+            keys.append({**jwk, 'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+        return {'keys': keys}
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+
+class StubOAuthTestCase(TestCase):
+    """Points the social providers at a local stub server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubOAuthServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        # Keep last_login writes off the background flusher thread.
+        patcher = mock.patch('account.last_login.last_logins', LastLoginBuffer(background=False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server.connections.clear()
+        self.server.requests.clear()
+        url = self.server.url
+        providers = {
+            'github': {
+                'client_id': 'id', 'client_secret': 'secret', 'token_url': f'{url}/token',
+                'userinfo_url': f'{url}/user', 'email_url': f'{url}/user/emails',
+            },
+            'google': {
+                'client_id': 'id', 'client_secret': 'secret', 'userinfo_url': f'{url}/userinfo',
+                'jwks_url': f'{url}/certs', 'issuers': ['https://accounts.google.com'],
+            },
+        }
+        settings = self.settings(SOCIAL_PROVIDERS=providers)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    async def login(self, **payload):
+        try:
+            return await self.async_client.post('/api/auth/social/', payload, content_type='application/json')
+        finally:
+            await oauth.close_http_client()
+
+
+class SocialLoginTests(StubOAuthTestCase):
+    async def test_github_login_fetches_profile_and_emails_concurrently(self):
+        response = await self.login(provider='github', code='abc')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['created'])
+        self.assertEqual(data['user']['email'], 'octo@example.com')
+        self.assertEqual(data['user']['username'], 'octocat')
+        self.assertIn('access', data)
+        # The token exchange's connection is kept alive and reused.
+        self.assertEqual(len(self.server.connections), 2)
+
+    async def test_google_login(self):
+        await User.objects.acreate(username='existing', email='g@example.com')
+        response = await self.login(provider='google', token='google-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['created'])
+
+    async def test_errors(self):
+        response = await self.login(provider='google', token='bad')
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'Invalid access token'}))
+        response = await self.login(provider='myspace', token='x')
+        self.assertEqual(response.status_code, 400)
+        response = await self.login(provider='google')
+        self.assertEqual(response.json(), {'error': 'No access token provided'})
+
+    async def test_client_is_shared_within_a_loop(self):
+        client = oauth.get_http_client()
+        self.assertIs(oauth.get_http_client(), client)
+        await oauth.close_http_client()
+        self.assertTrue(client.is_closed)
+
+
+class GoogleIDTokenTests(StubOAuthTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def setUp(self):
+        super().setUp()
+        self.server.signing_keys = {'k1': self.key}
+        oauth._jwks.clear()
+
+    def id_token(self, nonce, kid='k1', key=None, **claims):
+        now = int(time.time())
+        claims = {
+            'iss': 'https://accounts.google.com', 'aud': 'id', 'sub': '4321', 'iat': now, 'exp': now + 600,
+            'email': 'id@example.com', 'email_verified': True, 'nonce': nonce, **claims,
+        }
+        return jwt.encode(claims, key or self.key, algorithm='RS256', headers={'kid': kid})
+
+    async def issue_nonce(self, client=None):
+        response = await (client or self.async_client).get('/api/auth/social/nonce/')
+        return response.json()['nonce']
+
+    async def google_login(self, **token):
+        nonce = await self.issue_nonce()
+        return await self.login(provider='google', id_token=self.id_token(nonce, **token))
+
+    async def test_nonce_is_set_in_a_signed_http_only_cookie(self):
+        response = await self.async_client.get('/api/auth/social/nonce/')
+        cookie = response.cookies[oauth.NONCE_COOKIE]
+        self.assertTrue(cookie['httponly'])
+        self.assertEqual(cookie['max-age'], oauth.NONCE_MAX_AGE)
+        self.assertNotEqual(cookie.value, response.json()['nonce'])
+
+        response = await self.login(provider='google', id_token=self.id_token(response.json()['nonce']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.cookies[oauth.NONCE_COOKIE].value, '')
+
+    async def test_keys_are_fetched_once_and_cached(self):
+        for _ in range(3):
+            response = await self.google_login()
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['username'], '4321')
+        self.assertEqual(self.server.requests, {'/certs': 1})
+
+    async def test_keys_expire_with_max_age(self):
+        await self.google_login()
+        later = time.monotonic() + 301
+        with mock.patch('account.oauth.time.monotonic', return_value=later):
+            response = await self.google_login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.requests['/certs'], 2)
+
+    async def test_unknown_kid_refreshes_keys(self):
+        await self.google_login()
+        rotated = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.server.signing_keys['k2'] = rotated
+        later = time.monotonic() + oauth.JWKS_MIN_REFRESH_INTERVAL
+        with mock.patch('account.oauth.time.monotonic', return_value=later):
+            response = await self.google_login(kid='k2', key=rotated)
+            self.assertEqual(response.status_code, 200)
+            # Unknown kids don't trigger another fetch right away.
+            response = await self.google_login(kid='k3')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.server.requests['/certs'], 2)
+
+    async def test_concurrent_logins_fetch_keys_once(self):
+        async def login():
+            # One browser each, so each has its own nonce cookie.
+            client = AsyncClient()
+            nonce = await self.issue_nonce(client)
+            return await client.post(
+                '/api/auth/social/', {'provider': 'google', 'id_token': self.id_token(nonce)},
+                content_type='application/json',
+            )
+
+        try:
+            responses = await asyncio.gather(*(login() for _ in range(5)))
+        finally:
+            await oauth.close_http_client()
+        self.assertEqual([response.status_code for response in responses], [200] * 5)
+        self.assertEqual(self.server.requests, {'/certs': 1})
+
+    async def test_replayed_nonce_is_rejected(self):
+        nonce = await self.issue_nonce()
+        cookie = self.async_client.cookies[oauth.NONCE_COOKIE].value
+        token = self.id_token(nonce)
+        response = await self.login(provider='google', id_token=token)
+        self.assertEqual(response.status_code, 200)
+
+        # The captured token and cookie together are not enough a second time.
+        self.async_client.cookies[oauth.NONCE_COOKIE] = cookie
+        response = await self.login(provider='google', id_token=token)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid ID token: nonce already used')
+
+    async def test_rejects_invalid_tokens(self):
+        forged = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        for token in (
+            lambda nonce: self.id_token(nonce, key=forged),
+            lambda nonce: self.id_token(nonce, aud='someone-else'),
+            lambda nonce: self.id_token(nonce, iss='https://evil.example.com'),
+            lambda nonce: self.id_token(nonce, exp=int(time.time()) - 60),
+            lambda nonce: self.id_token(nonce, email_verified=False),
+            lambda nonce: self.id_token('chosen-by-the-client'),
+            lambda nonce: self.id_token(None),
+            lambda nonce: 'not-a-jwt',
+        ):
+            nonce = await self.issue_nonce()
+            response = await self.login(provider='google', id_token=token(nonce))
+            self.assertEqual(response.status_code, 400, token(nonce))
+        self.assertFalse(await User.objects.filter(email='id@example.com').aexists())
+
+    async def test_nonce_must_come_from_the_cookie(self):
+        nonce = await self.issue_nonce()
+        del self.async_client.cookies[oauth.NONCE_COOKIE]
+        response = await self.login(provider='google', id_token=self.id_token(nonce), nonce=nonce)
+        self.assertEqual(response.status_code, 400)
+
+        # A cookie that was not signed by the server is ignored.
+        self.async_client.cookies[oauth.NONCE_COOKIE] = nonce
+        response = await self.login(provider='google', id_token=self.id_token(nonce))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid ID token: nonce mismatch')
+
+
+class ServingTests(TestCase):
+    def test_wsgi_is_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            importlib.import_module('backend.wsgi')
+
+    async def test_lifespan_shutdown_closes_the_http_client(self):
+        client = oauth.get_http_client()
+        lifespan = ApplicationCommunicator(application, {'type': 'lifespan'})
+        await lifespan.send_input({'type': 'lifespan.startup'})
+        self.assertEqual(await lifespan.receive_output(), {'type': 'lifespan.startup.complete'})
+        self.assertFalse(client.is_closed)
+        await lifespan.send_input({'type': 'lifespan.shutdown'})
+        self.assertEqual(await lifespan.receive_output(), {'type': 'lifespan.shutdown.complete'})
+        self.assertTrue(client.is_closed)
+        await lifespan.wait()
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    url = '/api/auth/current/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', email='cached@example.com', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_user_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['data']['email'], 'cached@example.com')
+
+    def test_saving_the_user_drops_the_entry(self):
+        self.client.get(self.url)
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).json()['data']['first_name'], 'Renamed')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deleting_the_user_drops_the_entry(self):
+        self.client.get(self.url)
+        self.user.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class LastLoginTests(APITestCase):
+    def setUp(self):
+        self.buffer = LastLoginBuffer(background=False)
+        patcher = mock.patch('account.last_login.last_logins', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pass')
+            for i in range(3)
+        ]
+
+    def user_updates(self, queries):
+        return [q for q in queries if q['sql'].startswith('UPDATE "account_customuser"')]
+
+    def test_logins_are_written_in_one_batch(self):
+        with CaptureQueriesContext(connection) as queries:
+            for user in self.users:
+                response = self.client.post('/api/auth/login/', {'email': user.email, 'password': 'pass'}, format='json')
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_updates(queries), [])
+        self.assertFalse(User.objects.filter(last_login__isnull=False).exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(len(self.user_updates(queries)), 1)
+        self.assertEqual(User.objects.filter(last_login__isnull=False).count(), 3)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_keeps_the_latest_login_per_user(self):
+        user = self.users[0]
+        earlier = timezone.now()
+        later = earlier + timedelta(minutes=1)
+        self.buffer.record(user.pk, later)
+        self.buffer.record(user.pk, earlier)
+        for other in self.users[1:]:
+            self.buffer.record(other.pk, earlier)
+        with mock.patch('account.last_login.LAST_LOGIN_BATCH_SIZE', 2), \
+                CaptureQueriesContext(connection) as queries:
+            self.buffer.flush()
+        self.assertEqual(len(self.user_updates(queries)), 2)
+        user.refresh_from_db()
+        self.assertEqual(user.last_login, later)
+
+    def test_failed_flush_keeps_values(self):
+        when = timezone.now()
+        self.buffer.record(self.users[0].pk, when)
+        with mock.patch('django.db.models.QuerySet.update', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.buffer.flush()
+        self.assertEqual(self.buffer.flush(), 1)
+        self.users[0].refresh_from_db()
+        self.assertEqual(self.users[0].last_login, when)
@@ -1,33 +1,34 @@
+import json
+
+from asgiref.sync import sync_to_async
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from . import oauth
+from .last_login import record_login
 from .serializers import RegisterSerializer, LoginSerializer, UserSerializer
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
 User = get_user_model()
 
 
-def get_requests_session():
-    """Create a requests session with retry logic and proper SSL handling"""
-    session = requests.Session()
-    
-    # Configure retry strategy
-    retry = Retry(
-        total=3,
-        backoff_factor=0.3,
-        status_forcelist=[500, 502, 503, 504],
-    )
-    
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    
-    return session
+def token_response(user):
+    # RefreshToken.for_user() leaves last_login alone; it is written behind.
+    if jwt_settings.UPDATE_LAST_LOGIN:
+        record_login(user)
+    refresh = RefreshToken.for_user(user)
+    return {
+        "refresh": str(refresh),
+        "access": str(refresh.access_token),
+        "user": UserSerializer(user).data,
+    }
 
 
 class CurrentUserView(APIView):
@@ -43,12 +44,7 @@ class SignUpView(APIView):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            refresh = RefreshToken.for_user(user)
-            return Response({
-                "refresh": str(refresh),
-                "access": str(refresh.access_token),
-                "user": UserSerializer(user).data,
-            })
+            return Response(token_response(user))
         return Response(serializer.errors, status=400)
 
 
@@ -57,104 +53,83 @@ class LoginView(APIView):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data["user"]
-            refresh = RefreshToken.for_user(user)
-            return Response({
-                "refresh": str(refresh),
-                "access": str(refresh.access_token),
-                "user": UserSerializer(user).data,
-            })
+            return Response(token_response(user))
         return Response(serializer.errors, status=400)
 
 
-class SocialLoginView(APIView):
-    def post(self, request):
-        provider = request.data.get("provider")
-        token = request.data.get("token")
-        code = request.data.get("code")
+class SocialNonceView(View):
+    """A fresh nonce for a Google sign-in, also set in a signed HttpOnly cookie."""
 
-        if provider not in settings.SOCIAL_PROVIDERS:
-            return Response({"error": "Unsupported provider"}, status=400)
+    async def get(self, request):
+        nonce = oauth.new_nonce()
+        response = JsonResponse({"nonce": nonce})
+        response.set_signed_cookie(
+            oauth.NONCE_COOKIE, nonce, salt=oauth.NONCE_SALT,
+            max_age=oauth.NONCE_MAX_AGE, httponly=True, samesite="Lax",
+            secure=request.is_secure(),
+        )
+        response["Cache-Control"] = "no-store"
+        return response
 
-        conf = settings.SOCIAL_PROVIDERS[provider]
-        access_token = token
-        
-        # Create a session with retry logic
-        session = get_requests_session()
-
-        # GitHub: exchange code for access_token
-        if provider == "github" and code:
-            try:
-                token_resp = session.post(
-                    conf["token_url"],
-                    headers={"Accept": "application/json"},
-                    data={
-                        "client_id": conf["client_id"],
-                        "client_secret": conf["client_secret"],
-                        "code": code,
-                    },
-                    timeout=10,  # Add timeout
-                )
-                token_data = token_resp.json()
-                access_token = token_data.get("access_token")
-                
-                if not access_token:
-                    return Response({"error": f"Failed to get access token: {token_data}"}, status=400)
-            except Exception as e:
-                return Response({"error": f"GitHub token exchange failed: {str(e)}"}, status=500)
 
-        if not access_token:
-            return Response({"error": "No access token provided"}, status=400)
+@method_decorator(csrf_exempt, name="dispatch")
+class SocialLoginView(View):
+    """
+    Async so a login waiting on the provider holds no worker thread; runs
+    under the ASGI application. Provider calls live in ``account.oauth``.
+    """
+
+    async def post(self, request):
+        response = await self.authenticate(request)
+        if oauth.NONCE_COOKIE in request.COOKIES:
+            # A nonce is good for one attempt, whatever its outcome.
+            response.delete_cookie(oauth.NONCE_COOKIE, samesite="Lax")
+        return response
 
-        # Fetch user info with correct authorization header for each provider
+    async def authenticate(self, request):
         try:
-            if provider == "github":
-                # GitHub uses "token" prefix instead of "Bearer"
-                headers = {"Authorization": f"token {access_token}"}
+            payload = json.loads(request.body or b"{}")
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            return JsonResponse({"error": "Expected a JSON object"}, status=400)
+        provider = payload.get("provider")
+        access_token = payload.get("token")
+        code = payload.get("code")
+        id_token = payload.get("id_token")
+        # Only the cookie counts; a nonce in the body is ignored.
+        nonce = request.get_signed_cookie(
+            oauth.NONCE_COOKIE, default=None, salt=oauth.NONCE_SALT, max_age=oauth.NONCE_MAX_AGE,
+        )
+
+        if provider not in settings.SOCIAL_PROVIDERS:
+            return JsonResponse({"error": "Unsupported provider"}, status=400)
+        conf = settings.SOCIAL_PROVIDERS[provider]
+
+        try:
+            if provider == "google" and id_token:
+                email, username = await oauth.verify_google_id_token(conf, id_token, nonce)
             else:
-                # Google and others use "Bearer"
-                headers = {"Authorization": f"Bearer {access_token}"}
-                
-            userinfo_resp = session.get(conf["userinfo_url"], headers=headers, timeout=10)
-            
-            if userinfo_resp.status_code != 200:
-                return Response({"error": "Invalid access token"}, status=400)
-                
-            data = userinfo_resp.json()
-        except Exception as e:
-            return Response({"error": f"Failed to fetch user info: {str(e)}"}, status=500)
-
-        # Parse user info
-        if provider == "google":
-            email = data.get("email")
-            username = data.get("sub")
-        elif provider == "github":
-            email = data.get("email")
-            if not email:
-                try:
-                    # GitHub uses "token" prefix
-                    email_headers = {"Authorization": f"token {access_token}"}
-                    emails_resp = session.get(conf["email_url"], headers=email_headers, timeout=10)
-                    emails = emails_resp.json()
-                    email = next((e["email"] for e in emails if e.get("primary")), None)
-                except Exception as e:
-                    return Response({"error": f"Failed to fetch email: {str(e)}"}, status=500)
-            username = str(data.get("login"))  # GitHub uses "login" not "id" for username
+                # GitHub: exchange code for access_token
+                if provider == "github" and code:
+                    access_token = await oauth.exchange_github_code(conf, code)
+                if not access_token:
+                    return JsonResponse({"error": "No access token provided"}, status=400)
+                if provider == "github":
+                    email, username = await oauth.fetch_github_profile(conf, access_token)
+                else:
+                    email, username = await oauth.fetch_google_profile(conf, access_token)
+        except oauth.OAuthError as e:
+            return JsonResponse({"error": str(e)}, status=e.status)
 
         if not email:
-            return Response({"error": "Email not available"}, status=400)
+            return JsonResponse({"error": "Email not available"}, status=400)
 
         # Create or get user
-        user, created = User.objects.get_or_create(
+        user, created = await User.objects.aget_or_create(
             email=email, defaults={"username": username}
         )
 
         # Issue JWT
-        refresh = RefreshToken.for_user(user)
-        
-        return Response({
-            "refresh": str(refresh),
-            "access": str(refresh.access_token),
-            "user": UserSerializer(user).data,
-            "created": created,
-            "provider": provider,
-        })
+        tokens = await sync_to_async(token_response)(user)
+        return JsonResponse({**tokens, "created": created, "provider": provider})
@@ -22,6 +22,7 @@ ALLOWED_HOSTS = []
 
 # Application definition
 INSTALLED_APPS = [
+    'daphne',  # ASGI runserver, needed for WebSockets
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -64,7 +65,9 @@ TEMPLATES = [
     },
 ]
 
+# Fails on import: the app is served over ASGI only.
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
 
 # Database
 DATABASES = {
@@ -105,14 +108,41 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'account.CustomUser'
 
+# Cache
+# Per-process by default; point this at Redis/Memcached when running
+# several workers so invalidations reach every process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds a user's {workspace_id: role} map stays cached
+WORKSPACE_ROLE_CACHE_TIMEOUT = 300
+
+# Seconds an authenticated user stays cached. Kept short: with a
+# per-process cache, other workers only notice a deactivation once
+# their entry expires.
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Most seconds a login's last_login waits in memory before being written
+LAST_LOGIN_FLUSH_INTERVAL = 10
+
+# Pub/sub backend for WebSocket task events. LocalBroker only reaches
+# sockets held by the same process; swap in a shared backend with the
+# same interface when running several workers.
+REALTIME_BROKER = 'workspace.realtime.LocalBroker'
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'account.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'workspace.renderers.FastJSONRenderer',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'workspace.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
 # JWT Configuration
@@ -121,6 +151,7 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": False,
+    # Written in batches by account.last_login, not on every login.
     "UPDATE_LAST_LOGIN": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
@@ -132,6 +163,9 @@ SOCIAL_PROVIDERS = {
         "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
         "token_url": "https://oauth2.googleapis.com/token",
         "userinfo_url": "https://www.googleapis.com/oauth2/v3/userinfo",
+        # ID tokens are verified locally against these keys.
+        "jwks_url": "https://www.googleapis.com/oauth2/v3/certs",
+        "issuers": ["https://accounts.google.com", "accounts.google.com"],
     },
     "github": {
         "client_id": os.getenv("GITHUB_CLIENT_ID"),
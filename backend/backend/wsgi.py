@@ -1,16 +1,12 @@
 """
-WSGI config for backend project.
+WSGI is not supported: serve ``backend.asgi.application`` instead, e.g.
+with daphne (``manage.py runserver`` does so once daphne is installed).
 
-It exposes the WSGI callable as a module-level variable named ``application``.
-
-For more information on this file, see
-https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
+The async social login keeps one pooled HTTP client per event loop, and a
+WSGI server would run each such view on a fresh loop, leaking a client per
+request. ``/ws/tasks/`` needs ASGI as well.
 """
 
-import os
-
-from django.core.wsgi import get_wsgi_application
-
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+from django.core.exceptions import ImproperlyConfigured
 
-application = get_wsgi_application()
+raise ImproperlyConfigured('backend is served over ASGI only; use backend.asgi.application.')
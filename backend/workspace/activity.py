@@ -0,0 +1,103 @@
+"""
+Task activity log.
+
+``record_task_changes`` turns every task write into ``TaskActivity``
+entries and hands them to ``log_task_activity``, which buffers them per
+savepoint of the current transaction. Each buffer is written with a
+single ``bulk_create`` once the outermost transaction commits, so the log
+costs one INSERT per transaction (or savepoint) however many tasks
+changed, and nothing is logged for writes that roll back.
+"""
+import threading
+import weakref
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import TaskActivity
+from .pagination import KeysetPagination
+
+# Snapshot keys as they appear in ``TaskActivity.changes``.
+ACTIVITY_FIELDS = {
+    'project_id': 'project',
+    'title': 'title',
+    'description': 'description',
+    'assigned_to_id': 'assigned_to',
+    'status': 'status',
+    'due_date': 'due_date',
+}
+
+
+def _diff(before, after):
+    changes = {}
+    for key, name in ACTIVITY_FIELDS.items():
+        old = before.get(key) if before else None
+        new = after.get(key) if after else None
+        if old != new:
+            changes[name] = [old, new]
+    return changes
+
+
+def activity_entry(action, before, after, actor=None):
+    """
+    A ``TaskActivity`` for one task write, from snapshots taken before
+    and after it (``None`` for the side that doesn't exist), or ``None``
+    if no logged field changed.
+    """
+    changes = _diff(before, after)
+    if not changes:
+        return None
+    current = after or before
+    return TaskActivity(
+        task_id=current['id'], workspace_id=current['workspace_id'], project_id=current['project_id'],
+        actor=actor if actor is not None and actor.is_authenticated else None,
+        action=action, changes=changes, created_at=timezone.now(),
+    )
+
+
+class _ActivityBuffer:
+    def __init__(self):
+        self.entries = []
+        self.flushed = False
+
+    def flush(self):
+        self.flushed = True
+        TaskActivity.objects.bulk_create(self.entries, batch_size=1000)
+
+
+# Open buffers of this thread's transaction, by innermost savepoint id
+# (None outside any savepoint). Only its ``on_commit`` callback keeps a
+# buffer alive, so when a rollback discards the callback the buffer and
+# its entries go with it.
+_local = threading.local()
+
+
+def _open_buffers():
+    if not hasattr(_local, 'buffers'):
+        _local.buffers = weakref.WeakValueDictionary()
+    return _local.buffers
+
+
+def log_task_activity(entries):
+    """Buffer ``entries`` until the current transaction commits."""
+    entries = [entry for entry in entries if entry is not None]
+    if not entries:
+        return
+    if not connection.in_atomic_block:
+        TaskActivity.objects.bulk_create(entries, batch_size=1000)
+        return
+    savepoints = [sid for sid in connection.savepoint_ids if sid is not None]
+    key = savepoints[-1] if savepoints else None
+    buffers = _open_buffers()
+    buffer = buffers.get(key)
+    if buffer is None or buffer.flushed:
+        buffer = buffers[key] = _ActivityBuffer()
+        transaction.on_commit(buffer.flush)
+    buffer.entries.extend(entries)
+
+
+class ActivityPagination(KeysetPagination):
+    """Newest first, over the ``(task_id|workspace, created_at)`` indexes."""
+
+    def get_ordering(self, view):
+        return ('-created_at', '-id')
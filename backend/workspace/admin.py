@@ -1,24 +1,53 @@
 from django.contrib import admin
+from django.db import transaction
+from .changes import record_task_changes, task_snapshot
 from .models import Workspace, WorkspaceMember, Project, Task
 
 @admin.register(Workspace)
 class WorkspaceAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'created_by', 'invite_link']
+    list_select_related = ['created_by']
     search_fields = ['name', 'created_by__username']
 
 @admin.register(WorkspaceMember)
 class WorkspaceMemberAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'workspace', 'role']
+    list_select_related = ['user', 'workspace']
     list_filter = ['role']
     search_fields = ['user__username', 'workspace__name']
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'workspace', 'created_at', 'updated_at']
+    list_select_related = ['workspace']
     search_fields = ['name', 'workspace__name']
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ['id', 'title', 'project', 'assigned_to', 'status', 'due_date']
+    list_select_related = ['project', 'assigned_to']
     list_filter = ['status']
     search_fields = ['title', 'project__name', 'assigned_to__username']
+
+    # Admin writes report to record_task_changes like the API's do, so
+    # counters, tombstones, activity and live events stay in step.
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            before = task_snapshot(Task.objects.get(pk=obj.pk)) if change else None
+            super().save_model(request, obj, form, change)
+            if change:
+                record_task_changes(updated=[(before, obj)], actor=request.user)
+            else:
+                record_task_changes(created=[obj], actor=request.user)
+
+    def delete_model(self, request, obj):
+        snapshot = task_snapshot(obj)
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            record_task_changes(deleted=[snapshot], actor=request.user)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            snapshots = [task_snapshot(task) for task in queryset]
+            super().delete_queryset(request, queryset)
+            record_task_changes(deleted=snapshots, actor=request.user)
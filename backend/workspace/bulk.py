@@ -0,0 +1,30 @@
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class BulkCreateMixin:
+    """
+    Lets ``create`` take a JSON array as well as a single object. Arrays
+    are validated by the create serializer's list serializer, saved by
+    ``perform_bulk_create`` and answered with the created rows, in input
+    order, rendered by ``bulk_response_serializer_class``.
+    """
+    bulk_create_limit = 500
+    bulk_response_serializer_class = None
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        if len(request.data) > self.bulk_create_limit:
+            return Response({'error': f'At most {self.bulk_create_limit} items per request'}, status=400)
+
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+        instances = self.perform_bulk_create(serializer)
+        response_serializer = self.bulk_response_serializer_class(
+            instances, many=True, context=self.get_serializer_context()
+        )
+        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+
+    def perform_bulk_create(self, serializer):
+        return serializer.save()
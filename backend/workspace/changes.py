@@ -0,0 +1,133 @@
+"""
+Side effects of task writes.
+
+Every code path that creates, updates or deletes tasks -- viewset
+actions and bulk paths alike -- reports the change here, inside the
+transaction that made it, so derived data stays consistent however the
+rows were written.
+"""
+from collections import Counter
+
+from django.utils import timezone
+
+from .activity import activity_entry, log_task_activity
+from .counters import apply_counter_deltas
+from .models import Task, TaskCounter, TaskDeletion
+from .realtime import member_event, project_event, publish_on_commit, task_event, workspace_event
+from .sync import next_change_seq
+
+# Ids per UPDATE when stamping the change sequence.
+STAMP_BATCH_SIZE = 1000
+
+SNAPSHOT_FIELDS = (
+    'workspace_id', 'project_id', 'title', 'description',
+    'assigned_to_id', 'status', 'due_date',
+)
+
+
+def task_snapshot(task):
+    """Capture the fields of ``task`` that change tracking cares about."""
+    snapshot = {field: getattr(task, field) for field in SNAPSHOT_FIELDS}
+    snapshot['id'] = task.pk
+    return snapshot
+
+
+def _counter_key(snapshot):
+    return (snapshot['workspace_id'], snapshot['project_id'], snapshot['status'], snapshot['due_date'])
+
+
+def _tombstone(snapshot):
+    return TaskDeletion(
+        task_id=snapshot['id'], workspace_id=snapshot['workspace_id'], project_id=snapshot['project_id'],
+    )
+
+
+def _stamp_change_seq(tasks, tombstones):
+    # One sequence value per call; sync pages by (change_seq, id).
+    seq = next_change_seq()
+    for task in tasks:
+        task.change_seq = seq
+    ids = [task.pk for task in tasks]
+    for start in range(0, len(ids), STAMP_BATCH_SIZE):
+        Task.objects.filter(pk__in=ids[start:start + STAMP_BATCH_SIZE]).update(change_seq=seq)
+    for tombstone in tombstones:
+        tombstone.change_seq = seq
+
+
+def record_task_changes(created=(), updated=(), deleted=(), actor=None):
+    """
+    ``created`` holds saved tasks, ``updated`` holds
+    ``(snapshot_before, task)`` pairs and ``deleted`` holds snapshots taken
+    before the rows were deleted. ``actor`` is the user the activity log
+    attributes the changes to.
+    """
+    deltas = Counter()
+    written = []
+    tombstones = []
+    events = []
+    activity = []
+    for task in created:
+        written.append(task)
+        after = task_snapshot(task)
+        deltas[_counter_key(after)] += 1
+        events.append(task_event('created', {**after, 'updated_at': task.updated_at}))
+        activity.append(activity_entry('created', None, after, actor))
+    for before, task in updated:
+        written.append(task)
+        after = task_snapshot(task)
+        deltas[_counter_key(before)] -= 1
+        deltas[_counter_key(after)] += 1
+        activity.append(activity_entry('updated', before, after, actor))
+        if before['workspace_id'] != after['workspace_id']:
+            # Gone from the old workspace as far as its sync clients go.
+            tombstones.append(_tombstone(before))
+            events.append(task_event('deleted', before))
+        events.append(task_event('updated', {**after, 'updated_at': task.updated_at}))
+    for snapshot in deleted:
+        deltas[_counter_key(snapshot)] -= 1
+        tombstones.append(_tombstone(snapshot))
+        events.append(task_event('deleted', snapshot))
+        activity.append(activity_entry('deleted', snapshot, None, actor))
+
+    apply_counter_deltas(deltas)
+    if written or tombstones:
+        _stamp_change_seq(written, tombstones)
+    if tombstones:
+        TaskDeletion.objects.bulk_create(tombstones)
+    publish_on_commit(events)
+    log_task_activity(activity)
+
+
+def record_project_change(action, project):
+    """Publish a project create/update/delete to its workspace."""
+    publish_on_commit([project_event(action, project)])
+
+
+def record_project_move(project, previous_workspace_id):
+    """
+    Carry a project's tasks and their derived data into its new workspace.
+    Live subscribers see the project leave the old workspace and arrive in
+    the new one, and reload its tasks from there.
+    """
+    tasks = project.tasks.all()
+    seq = next_change_seq()
+    TaskDeletion.objects.bulk_create(
+        TaskDeletion(task_id=task_id, workspace_id=previous_workspace_id, project_id=project.id, change_seq=seq)
+        for task_id in tasks.values_list('id', flat=True).iterator()
+    )
+    tasks.update(workspace_id=project.workspace_id, updated_at=timezone.now(), change_seq=seq)
+    TaskCounter.objects.filter(project=project).update(workspace_id=project.workspace_id)
+    publish_on_commit([
+        project_event('deleted', project, workspace_id=previous_workspace_id),
+        project_event('created', project),
+    ])
+
+
+def record_workspace_deleted(workspace):
+    """Publish a workspace deletion; its subscribers stop receiving its events."""
+    publish_on_commit([workspace_event('deleted', workspace)])
+
+
+def record_member_removed(member):
+    """Publish a membership removal; the removed user's sockets stop receiving the workspace's events."""
+    publish_on_commit([member_event('deleted', member)])
@@ -0,0 +1,90 @@
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .sparse import EXPAND_PARAM, parse_names
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified validators for ``list`` and ``retrieve``, computed
+    before any serializer work so an unchanged poll answers 304 after a
+    single small query.
+
+    List ETags hash the request path, the user and the ``(pk, updated_at)``
+    of every row on the requested page, plus the ``updated_at`` of each
+    ``etag_related`` path (relations whose fields the serializer renders)
+    and of the ``etag_expand_related`` paths of each ``?expand=`` name.
+    With a paginator exposing ``get_page_queryset()`` that is one index
+    range read of at most page_size + 1 rows; otherwise the row count and
+    newest timestamps of the whole queryset are aggregated. Lists carry
+    only an ETag, since a deletion does not move the newest timestamp and
+    Last-Modified alone would miss it. Detail responses carry both.
+    """
+    etag_related = ()
+    detail_etag_related = None
+    etag_expand_related = {}
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = self.get_list_etag(queryset)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag)
+        return self._with_validators(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.get_detail_validators(instance)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=timegm(last_modified.utctimetuple())
+        )
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag, last_modified)
+        serializer = self.get_serializer(instance)
+        return self._with_validators(Response(serializer.data), etag, last_modified)
+
+    def get_etag_related(self, detail=False):
+        related = self.etag_related
+        if detail and self.detail_etag_related is not None:
+            related = self.detail_etag_related
+        expanded = parse_names(self.request, EXPAND_PARAM) or ()
+        extra = [path for name in sorted(expanded) for path in self.etag_expand_related.get(name, ())]
+        return tuple(dict.fromkeys((*related, *extra)))
+
+    def get_list_etag(self, queryset):
+        paths = ('updated_at', *self.get_etag_related())
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, 'get_page_queryset'):
+            page = paginator.get_page_queryset(queryset, self.request, view=self)
+            return self._etag(*page.values_list('pk', *paths))
+
+        aggregates = {f'max_{index}': Max(path) for index, path in enumerate(paths)}
+        values = queryset.order_by().aggregate(count=Count('pk'), **aggregates)
+        return self._etag(values['count'], *(values[key] for key in sorted(aggregates)))
+
+    def get_detail_validators(self, instance):
+        stamps = [instance.updated_at]
+        for path in self.get_etag_related(detail=True):
+            value = instance
+            for attr in path.split('__'):
+                # Nullable relations such as an unassigned task.
+                value = getattr(value, attr) if value is not None else None
+            stamps.append(value)
+        return self._etag(instance.pk, *stamps), max(stamp for stamp in stamps if stamp is not None)
+
+    def _etag(self, *parts):
+        raw = '|'.join(str(part) for part in (self.request.user.pk, self.request.get_full_path(), *parts))
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    @staticmethod
+    def _with_validators(response, etag, last_modified=None):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+        patch_vary_headers(response, ['Authorization'])
+        return response
@@ -0,0 +1,80 @@
+"""
+Incrementally maintained task counts behind the project and workspace
+stats endpoints. Deltas are produced by ``workspace.changes`` and must
+be applied in the same transaction as the task writes they describe.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Task, TaskCounter
+
+STATUSES = [value for value, label in Task._meta.get_field('status').choices]
+CLOSED_STATUSES = {'done'}
+
+
+def apply_counter_deltas(deltas):
+    """
+    Apply ``{(workspace_id, project_id, status, due_date): delta}``.
+    Keys are applied in sorted order so concurrent writers lock counter
+    rows in the same sequence.
+    """
+    for key in sorted(deltas, key=lambda key: (key[1], key[2], key[3] is not None, key[3])):
+        delta = deltas[key]
+        if delta:
+            _apply_delta(key, delta)
+
+
+def _apply_delta(key, delta):
+    workspace_id, project_id, status, due_date = key
+    bucket = TaskCounter.objects.filter(project_id=project_id, status=status, due_date=due_date)
+    if bucket.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            TaskCounter.objects.create(
+                workspace_id=workspace_id, project_id=project_id,
+                status=status, due_date=due_date, count=delta,
+            )
+    except IntegrityError:
+        # Another writer created the bucket first.
+        bucket.update(count=F('count') + delta)
+
+
+def get_task_stats(**scope):
+    """
+    Task counts for a ``project_id=`` or ``workspace_id=`` scope, read
+    from the counter table in a single aggregate query.
+    """
+    today = timezone.localdate()
+    rows = TaskCounter.objects.filter(**scope).values('status').annotate(
+        total=Sum('count'),
+        overdue=Sum('count', filter=Q(due_date__lt=today)),
+    )
+    by_status = dict.fromkeys(STATUSES, 0)
+    overdue = 0
+    for row in rows:
+        by_status[row['status']] = row['total']
+        if row['status'] not in CLOSED_STATUSES:
+            overdue += row['overdue'] or 0
+    return {
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'overdue': overdue,
+    }
+
+
+def rebuild_counters(batch_size=1000):
+    """Recompute every counter from the task table. Returns the bucket count."""
+    buckets = (
+        Task.objects.live().order_by()
+        .values('workspace_id', 'project_id', 'status', 'due_date')
+        .annotate(count=Count('id'))
+    )
+    with transaction.atomic():
+        TaskCounter.objects.all().delete()
+        counters = TaskCounter.objects.bulk_create(
+            (TaskCounter(**bucket) for bucket in buckets.iterator(chunk_size=batch_size)),
+            batch_size=batch_size,
+        )
+    return len(counters)
@@ -0,0 +1,63 @@
+"""
+Due-date range filters and the per-day task calendar.
+
+Both read ranges of the ``(workspace, due_date)`` and
+``(project, due_date)`` indexes instead of loading whole lists.
+"""
+import datetime
+
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .counters import CLOSED_STATUSES
+
+CALENDAR_MAX_DAYS = 366
+CALENDAR_TASKS_PER_DAY = 50
+CALENDAR_MAX_TASKS_PER_DAY = 200
+
+
+def parse_date_param(params, name):
+    """The ``YYYY-MM-DD`` query param ``name`` as a date, ``None`` if absent."""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: ['Date has wrong format. Use YYYY-MM-DD.']})
+
+
+def overdue_q(today=None):
+    """Open tasks whose due date has passed."""
+    today = today or timezone.localdate()
+    return Q(due_date__lt=today) & ~Q(status__in=CLOSED_STATUSES)
+
+
+def task_calendar(queryset, start, end, serializer, per_day=CALENDAR_TASKS_PER_DAY):
+    """
+    Tasks of ``queryset`` due between ``start`` and ``end`` (inclusive),
+    grouped by day as ``[{'date', 'count', 'tasks'}]`` for days with any.
+
+    One query: window functions count every day's tasks in SQL and cap
+    the rows returned per day at ``per_day``, so ``count`` can exceed
+    ``len(tasks)``. ``serializer`` is a ``TaskValuesSerializer``.
+    """
+    rows = list(
+        queryset.filter(due_date__range=(start, end))
+        .annotate(
+            day_count=Window(Count('id'), partition_by=F('due_date')),
+            day_position=Window(RowNumber(), partition_by=F('due_date'), order_by=F('id').asc()),
+        )
+        .filter(day_position__lte=per_day)
+        .order_by('due_date', 'day_position')
+        .values(*dict.fromkeys([*serializer.paths, 'due_date', 'day_count']))
+    )
+
+    days = []
+    for row, task in zip(rows, serializer.serialize(rows)):
+        if not days or days[-1]['date'] != row['due_date']:
+            days.append({'date': row['due_date'], 'count': row['day_count'], 'tasks': []})
+        days[-1]['tasks'].append(task)
+    return days
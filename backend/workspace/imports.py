@@ -0,0 +1,238 @@
+"""
+Bulk task import from CSV or NDJSON.
+
+Files are parsed as a stream and handled in chunks: each chunk resolves
+its project and assignee references with one query apiece, then inserts
+its valid rows with a single ``bulk_create`` in its own transaction.
+Invalid rows are reported with their row number and skipped; they never
+abort the rest of the import.
+
+Columns match the export (see ``export.EXPORT_COLUMNS``): ``project`` is
+a project name or id within the target workspace, ``assigned_to`` a user
+email or id (numeric values are always taken as ids), and
+``id``/``created_at``/``updated_at`` are ignored.
+"""
+import csv
+import datetime
+import json
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from .changes import record_task_changes
+from .models import Project, Task
+from .rebalance import rebalance_if_needed
+
+User = get_user_model()
+
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Row errors kept in the result; the rest are only counted.
+MAX_REPORTED_ERRORS = 1000
+
+TITLE_MAX_LENGTH = Task._meta.get_field('title').max_length
+STATUSES = {value for value, _ in Task._meta.get_field('status').choices}
+
+INVALID_ENCODING = 'Row is not valid UTF-8.'
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+
+class _Lines:
+    """
+    The lines of a binary file decoded as UTF-8, one at a time. A line that
+    doesn't decode is passed on with replacement characters and flagged,
+    so the row holding it is reported instead of aborting the import.
+    """
+
+    def __init__(self, stream):
+        self.lines = iter(stream)
+        self.encoding = 'utf-8-sig'
+        self.invalid = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self.lines)
+        if isinstance(line, str):
+            return line
+        encoding, self.encoding = self.encoding, 'utf-8'
+        try:
+            return line.decode(encoding)
+        except UnicodeDecodeError:
+            self.invalid = True
+            return line.decode(encoding, 'replace')
+
+    def take_invalid(self):
+        """Whether a line read since the last call failed to decode."""
+        invalid, self.invalid = self.invalid, False
+        return invalid
+
+
+def _csv_rows(lines):
+    reader = csv.DictReader(lines)
+    # Row 1 is the header.
+    number = 1
+    while True:
+        number += 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # e.g. a field over csv.field_size_limit(); the reader carries
+            # on with the next line.
+            lines.take_invalid()
+            yield number, None, f'Row could not be parsed: {e}.'
+            continue
+        if lines.take_invalid():
+            yield number, None, INVALID_ENCODING
+        else:
+            yield number, row, None
+
+
+def _ndjson_rows(lines):
+    for number, line in enumerate(lines, 1):
+        if lines.take_invalid():
+            yield number, None, INVALID_ENCODING
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if isinstance(row, dict):
+            yield number, row, None
+        else:
+            yield number, None, 'Row is not a JSON object.'
+
+
+def _text(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _parse(row):
+    """Validate the plain fields of ``row``; returns ``(data, errors)``."""
+    errors = {}
+    data = {
+        'project': _text(row.get('project')),
+        'assigned_to': _text(row.get('assigned_to')),
+        'title': _text(row.get('title')),
+        'description': _text(row.get('description')) or None,
+        'status': _text(row.get('status')) or 'todo',
+        'due_date': None,
+    }
+    if not data['project']:
+        errors['project'] = ['This field is required.']
+    if not data['title']:
+        errors['title'] = ['This field is required.']
+    elif len(data['title']) > TITLE_MAX_LENGTH:
+        errors['title'] = [f'Ensure this field has no more than {TITLE_MAX_LENGTH} characters.']
+    if data['status'] not in STATUSES:
+        errors['status'] = [f'"{data["status"]}" is not a valid choice.']
+    due_date = _text(row.get('due_date'))
+    if due_date:
+        try:
+            data['due_date'] = datetime.date.fromisoformat(due_date)
+        except ValueError:
+            errors['due_date'] = ['Date has wrong format. Use YYYY-MM-DD.']
+    return data, errors
+
+
+def _reference_filter(references, key_field):
+    """Match numeric references by pk and the rest by ``key_field``."""
+    ids = {int(ref) for ref in references if ref.isdigit()}
+    keys = {ref for ref in references if not ref.isdigit()}
+    return Q(pk__in=ids) | Q(**{f'{key_field}__in': keys})
+
+
+def _import_chunk(workspace, chunk, result, actor):
+    project_refs = {data['project'] for _, data in chunk}
+    user_refs = {data['assigned_to'] for _, data in chunk if data['assigned_to']}
+
+    projects = {}
+    matches = Project.objects.filter(_reference_filter(project_refs, 'name'), workspace=workspace, deleted_at__isnull=True)
+    for project_id, name in matches.order_by('id').values_list('id', 'name'):
+        projects[str(project_id)] = project_id
+        # Duplicate names resolve to the oldest project.
+        projects.setdefault(name, project_id)
+    users = {}
+    if user_refs:
+        # Only members of the workspace can be assigned its tasks.
+        matches = User.objects.filter(_reference_filter(user_refs, 'email'), workspacemember__workspace=workspace)
+        for user_id, email in matches.order_by('id').values_list('id', 'email'):
+            users[str(user_id)] = user_id
+            users.setdefault(email, user_id)
+
+    tasks = []
+    for number, data in chunk:
+        errors = {}
+        project_id = projects.get(data['project'])
+        if project_id is None:
+            errors['project'] = ['Project not found in this workspace.']
+        assignee_id = users.get(data['assigned_to']) if data['assigned_to'] else None
+        if data['assigned_to'] and assignee_id is None:
+            errors['assigned_to'] = ['User not found in this workspace.']
+        if errors:
+            result.add_error(number, errors)
+            continue
+        tasks.append(Task(
+            project_id=project_id, workspace_id=workspace.id, assigned_to_id=assignee_id,
+            title=data['title'], description=data['description'],
+            status=data['status'], due_date=data['due_date'],
+        ))
+
+    if tasks:
+        with transaction.atomic():
+            Task.assign_ranks(tasks)
+            Task.objects.bulk_create(tasks)
+            record_task_changes(created=tasks, actor=actor)
+            rebalance_if_needed(tasks)
+        result.created += len(tasks)
+
+
+def import_tasks(workspace, stream, input_format='csv', chunk_size=IMPORT_CHUNK_SIZE, actor=None):
+    """
+    Import tasks into ``workspace`` from ``stream``, a text or binary file
+    object in one of ``IMPORT_FORMATS``. Returns an ``ImportResult``; rows
+    that can't be decoded or parsed are reported like invalid ones.
+    Chunks that were already inserted stay inserted if a later one fails.
+    ``actor`` is recorded as the author of the created tasks' activity.
+    """
+    lines = _Lines(stream)
+    rows = _csv_rows(lines) if input_format == 'csv' else _ndjson_rows(lines)
+
+    result = ImportResult()
+    chunk = []
+    for number, row, error in rows:
+        if error:
+            result.add_error(number, {'non_field_errors': [error]})
+            continue
+        data, errors = _parse(row)
+        if errors:
+            result.add_error(number, errors)
+            continue
+        chunk.append((number, data))
+        if len(chunk) == chunk_size:
+            _import_chunk(workspace, chunk, result, actor)
+            chunk = []
+    if chunk:
+        _import_chunk(workspace, chunk, result, actor)
+    return result
@@ -0,0 +1,91 @@
+"""
+A small database-backed job queue, worked by ``manage.py run_jobs``.
+
+``enqueue`` inserts a ``Job`` row in the caller's transaction, so a job
+exists exactly when the write that asked for it commits. Workers claim
+jobs with a conditional UPDATE (SQLite has no ``SKIP LOCKED``) and hold
+them for a lease; a job whose worker died is claimed again once the lease
+runs out, so handlers must be safe to re-run. Failed jobs are retried
+with exponential backoff, up to ``JOB_MAX_ATTEMPTS`` runs.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job name -> dotted path of the function called with the job's args.
+JOB_HANDLERS = {
+    'purge_workspace': 'workspace.purge.purge_workspace',
+    'purge_project': 'workspace.purge.purge_project',
+    'rebalance_column': 'workspace.rebalance.rebalance_column',
+}
+
+JOB_LEASE = timedelta(minutes=10)
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = timedelta(seconds=5)
+
+
+def enqueue(name, unique=False, **args):
+    """
+    Queue ``JOB_HANDLERS[name](**args)``. With ``unique``, an identical job
+    that has not started yet is reused instead of queueing another.
+    """
+    if name not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job {name!r}')
+    if unique:
+        existing = Job.objects.filter(name=name, args=args, state=Job.PENDING).first()
+        if existing is not None:
+            return existing
+    return Job.objects.create(name=name, args=args)
+
+
+def _claimable(now):
+    return Q(state=Job.PENDING, run_after__lte=now) | Q(state=Job.RUNNING, locked_until__lt=now)
+
+
+def claim_job(lease=JOB_LEASE):
+    """The next due job, marked running for ``lease``; ``None`` if there is none."""
+    now = timezone.now()
+    candidates = Job.objects.filter(_claimable(now)).order_by('run_after', 'id').values_list('id', flat=True)
+    for job_id in candidates[:10]:
+        # Only one worker's UPDATE can match; the others move on.
+        claimed = Job.objects.filter(_claimable(now), id=job_id).update(
+            state=Job.RUNNING, locked_until=now + lease, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome. Returns whether it succeeded."""
+    try:
+        import_string(JOB_HANDLERS[job.name])(**job.args)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.id, job.name)
+        retry = job.attempts < JOB_MAX_ATTEMPTS
+        Job.objects.filter(id=job.id).update(
+            state=Job.PENDING if retry else Job.FAILED,
+            run_after=timezone.now() + JOB_RETRY_DELAY * 2 ** (job.attempts - 1),
+            locked_until=None,
+            last_error=traceback.format_exc(),
+        )
+        return False
+    Job.objects.filter(id=job.id).delete()
+    return True
+
+
+def run_pending_jobs():
+    """Run due jobs until none is left. Returns the number run."""
+    count = 0
+    while (job := claim_job()) is not None:
+        run_job(job)
+        count += 1
+    return count
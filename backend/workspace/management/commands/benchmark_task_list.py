@@ -0,0 +1,77 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from workspace.models import Project, Task, Workspace
+from workspace.renderers import FastJSONRenderer
+from workspace.serializers import TaskSerializer, TaskValuesSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Time serializing and rendering a task list through TaskSerializer + "
+        "JSONRenderer versus the values() fast path. Sample rows are created "
+        "inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            project = self.create_rows(options['rows'])
+            queryset = Task.objects.filter(project=project).order_by('-updated_at', '-id')
+            serializer = TaskValuesSerializer()
+
+            def model_path():
+                data = TaskSerializer(queryset.select_related('project', 'assigned_to'), many=True).data
+                return JSONRenderer().render(data)
+
+            def values_path(renderer):
+                return renderer.render(serializer.serialize(queryset.values(*serializer.paths)))
+
+            timings = [
+                ('ModelSerializer + JSONRenderer', model_path),
+                ('values() + JSONRenderer', lambda: values_path(JSONRenderer())),
+                ('values() + FastJSONRenderer', lambda: values_path(FastJSONRenderer())),
+            ]
+            baseline = None
+            for label, run in timings:
+                best = self.best_of(run, options['repeat'])
+                baseline = baseline or best
+                self.stdout.write(f"{label:<32} {best * 1000:9.1f} ms  {baseline / best:5.1f}x")
+            transaction.set_rollback(True)
+
+    def create_rows(self, count):
+        user = User.objects.create_user(username='benchmark', email='benchmark@example.com')
+        workspace = Workspace.objects.create(name='Benchmark', created_by=user)
+        project = Project.objects.create(workspace=workspace, name='Benchmark')
+        Task.objects.bulk_create(
+            (
+                Task(
+                    project=project, workspace=workspace, title=f'Task {i}',
+                    description='Lorem ipsum dolor sit amet. ' * 8,
+                    assigned_to=user if i % 2 else None,
+                    status=('todo', 'in_progress', 'done')[i % 3],
+                )
+                for i in range(count)
+            ),
+            batch_size=1000,
+        )
+        return project
+
+    @staticmethod
+    def best_of(run, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from workspace.imports import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, import_tasks
+from workspace.models import Workspace
+
+
+class Command(BaseCommand):
+    help = "Import tasks into a workspace from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('workspace_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--input', choices=IMPORT_FORMATS,
+                            help="File format; defaults to ndjson for .ndjson/.jsonl files, else csv.")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            workspace = Workspace.objects.get(pk=options['workspace_id'])
+        except Workspace.DoesNotExist:
+            raise CommandError(f"Workspace {options['workspace_id']} does not exist.")
+
+        path = options['path']
+        input_format = options['input'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        with open(path, 'rb') as stream:
+            result = import_tasks(workspace, stream, input_format, chunk_size=options['chunk_size'])
+
+        for error in result.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if result.failed > len(result.errors):
+            self.stderr.write(f"... and {result.failed - len(result.errors)} more failed rows.")
+        self.stdout.write(self.style.SUCCESS(f"Imported {result.created} tasks, {result.failed} rows failed."))
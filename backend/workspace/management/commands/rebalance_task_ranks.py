@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from workspace.rebalance import rebalance_long_ranks
+
+
+class Command(BaseCommand):
+    help = "Rewrite the ranks of every board column holding an overly long rank."
+
+    def handle(self, *args, **options):
+        changed = rebalance_long_ranks()
+        self.stdout.write(self.style.SUCCESS(f"Rebalanced {changed} task ranks."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from workspace.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-project/per-workspace task counters from the task table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        buckets = rebuild_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} task counter buckets."))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from workspace.jobs import claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (workspace and project purges, rank rebalancing)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty instead of polling.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds between polls of an empty queue.")
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                close_old_connections()
+                job = claim_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                if run_job(job):
+                    self.stdout.write(f"Ran job {job.id} ({job.name}).")
+                else:
+                    self.stderr.write(f"Job {job.id} ({job.name}) failed.")
+        except KeyboardInterrupt:
+            # A job cut short is claimed again once its lease runs out.
+            pass
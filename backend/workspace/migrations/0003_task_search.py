@@ -0,0 +1,61 @@
+from django.db import migrations
+
+from workspace.search import SQLITE_FTS_DROP_TRIGGERS, SQLITE_FTS_TRIGGERS, fts5_available
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE workspace_task_fts USING fts5(
+        title, description,
+        content='workspace_task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    *SQLITE_FTS_TRIGGERS,
+    "INSERT INTO workspace_task_fts(workspace_task_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    *SQLITE_FTS_DROP_TRIGGERS,
+    "DROP TABLE IF EXISTS workspace_task_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX task_search_idx ON workspace_task USING GIN (
+        to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))
+    )
+    """,
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS task_search_idx",
+]
+
+
+def _statements(vendor, sqlite, postgres):
+    if vendor == 'sqlite' and fts5_available():
+        return sqlite
+    if vendor == 'postgresql':
+        return postgres
+    return []
+
+
+def create_search_index(apps, schema_editor):
+    for statement in _statements(schema_editor.connection.vendor, SQLITE_FORWARD, POSTGRES_FORWARD):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in _statements(schema_editor.connection.vendor, SQLITE_REVERSE, POSTGRES_REVERSE):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspace', '0002_task_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspace', '0003_task_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workspacemember',
+            index=models.Index(fields=['user', 'workspace'], name='member_user_workspace_idx'),
+        ),
+    ]
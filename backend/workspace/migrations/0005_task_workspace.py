@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 1000
+
+
+def backfill_task_workspace(apps, schema_editor):
+    Task = apps.get_model('workspace', 'Task')
+    Project = apps.get_model('workspace', 'Project')
+    project_workspace = Project.objects.filter(id=OuterRef('project_id')).values('workspace_id')
+
+    # Non-atomic migration: every batch commits on its own so large tables
+    # never hold one long write transaction.
+    while True:
+        batch = list(
+            Task.objects.filter(workspace__isnull=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        Task.objects.filter(id__in=batch).update(workspace_id=Subquery(project_workspace))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('workspace', '0004_member_user_workspace_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='workspace',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='workspace.workspace'),
+        ),
+        migrations.RunPython(backfill_task_workspace, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+from workspace.search import restore_sqlite_search_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspace', '0005_task_workspace'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='task',
+            name='workspace',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='workspace.workspace'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['workspace', 'status', 'due_date'], name='task_workspace_status_due_idx'),
+        ),
+        migrations.RunPython(restore_sqlite_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    Task = apps.get_model('workspace', 'Task')
+    TaskCounter = apps.get_model('workspace', 'TaskCounter')
+    buckets = (
+        Task.objects.order_by()
+        .values('workspace_id', 'project_id', 'status', 'due_date')
+        .annotate(count=Count('id'))
+    )
+    TaskCounter.objects.bulk_create(
+        (TaskCounter(**bucket) for bucket in buckets.iterator(chunk_size=1000)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspace', '0006_task_workspace_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=50)),
+                ('due_date', models.DateField(blank=True, null=True)),
+                ('count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='workspace.project')),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='workspace.workspace')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['workspace', 'status'], name='task_counter_workspace_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'status', 'due_date'), name='task_counter_bucket'), models.UniqueConstraint(condition=models.Q(('due_date__isnull', True)), fields=('project', 'status'), name='task_counter_undated_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
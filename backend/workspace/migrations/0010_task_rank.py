@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+from workspace.ranks import spaced_ranks
+from workspace.search import restore_sqlite_search_triggers
+
+
+def rank_existing_tasks(apps, schema_editor):
+    # Existing columns keep their creation order.
+    Task = apps.get_model('workspace', 'Task')
+    columns = Task.objects.order_by().values_list('project_id', 'status').distinct()
+    for project_id, status in list(columns):
+        tasks = list(Task.objects.filter(project_id=project_id, status=status).order_by('id').only('id'))
+        for task, rank in zip(tasks, spaced_ranks(len(tasks))):
+            task.rank = rank
+        Task.objects.bulk_update(tasks, ['rank'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspace', '0009_task_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='rank',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.RunPython(rank_existing_tasks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status', 'rank'], name='task_project_status_rank_idx'),
+        ),
+        migrations.RunPython(restore_sqlite_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+from workspace.search import restore_sqlite_search_triggers
+
+
+def create_sequence(apps, schema_editor):
+    apps.get_model('workspace', 'ChangeSequence').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspace', '0013_job_queue_and_pending_deletes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='taskdeletion',
+            name='task_deletion_workspace_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='taskdeletion',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['workspace', 'change_seq'], name='task_workspace_change_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskdeletion',
+            index=models.Index(fields=['workspace', 'change_seq'], name='task_deletion_change_seq_idx'),
+        ),
+        migrations.RunPython(create_sequence, migrations.RunPython.noop),
+        migrations.RunPython(restore_sqlite_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspace', '0014_task_change_sequence'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_project_status_idx',
+        ),
+    ]
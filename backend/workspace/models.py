@@ -1,13 +1,48 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .ranks import RANK_MAX_LENGTH, rank_between
 
 User = get_user_model()
 
+
+def member_workspace_ids(user):
+    """Subquery selecting the ids of every workspace ``user`` belongs to."""
+    return WorkspaceMember.objects.filter(user=user).values('workspace_id')
+
+
+class WorkspaceQuerySet(models.QuerySet):
+    def for_user(self, user):
+        return self.filter(models.Exists(
+            WorkspaceMember.objects.filter(workspace=models.OuterRef('pk'), user=user)
+        ), deleted_at__isnull=True)
+
+
+class WorkspaceScopedQuerySet(models.QuerySet):
+    """
+    Scopes rows that belong to a workspace through ``workspace_lookup``
+    with a ``workspace_id IN (subquery)`` filter rather than a JOIN, so
+    no DISTINCT is needed and index-ordered pagination stays possible.
+    """
+    workspace_lookup = 'workspace_id'
+
+    def for_user(self, user):
+        return self.filter(**{f'{self.workspace_lookup}__in': member_workspace_ids(user)})
+
+
 class Workspace(models.Model):
     name = models.CharField(max_length=100)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     image_url = models.URLField(blank=True, null=True)
     invite_link = models.CharField(max_length=100, blank=True, null=True)  # changed from URLField
+    updated_at = models.DateTimeField(auto_now=True)
+    # Set when the workspace is deleted; workspace.purge removes it later.
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = WorkspaceQuerySet.as_manager()
+
     def __str__(self):
         return self.name
     
@@ -15,9 +50,24 @@ class WorkspaceMember(models.Model):
     workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='memberships')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     role = models.CharField(max_length=50, choices=[('admin', 'Admin'), ('member', 'Member')], default='member')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = WorkspaceScopedQuerySet.as_manager()
+
+    class Meta:
+        # Covers the member_workspace_ids() subquery used for access scoping.
+        indexes = [
+            models.Index(fields=['user', 'workspace'], name='member_user_workspace_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} in {self.workspace.name}"
     
+class ProjectQuerySet(WorkspaceScopedQuerySet):
+    def for_user(self, user):
+        return super().for_user(user).filter(deleted_at__isnull=True)
+
+
 class Project(models.Model):
     workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='projects')
     name = models.CharField(max_length=100)
@@ -25,11 +75,37 @@ class Project(models.Model):
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set when the project is deleted; workspace.purge removes it later.
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['deleted_at'], condition=models.Q(deleted_at__isnull=False),
+                name='project_pending_delete_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
-    
+
+
+class TaskQuerySet(WorkspaceScopedQuerySet):
+    def live(self):
+        """Leave out the tasks of projects waiting to be purged."""
+        return self.exclude(project_id__in=Project.objects.filter(deleted_at__isnull=False).values('id'))
+
+    def for_user(self, user):
+        return super().for_user(user).live()
+
+
 class Task(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='tasks')
+    # Denormalized from project.workspace so scoping needs no join; save()
+    # keeps it in step, bulk paths must set it themselves.
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='tasks')
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
@@ -41,7 +117,204 @@ class Task(models.Model):
         ('backlog', 'Backlog')
     ], default='todo')
     due_date = models.DateField(blank=True, null=True)
+    # Position within the (project, status) column; see workspace.ranks.
+    rank = models.CharField(max_length=RANK_MAX_LENGTH, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # ChangeSequence value of the latest write, stamped by workspace.changes.
+    change_seq = models.BigIntegerField(default=0)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        # Matched to the filter combinations TaskViewSet.get_queryset builds
+        # and to the (-updated_at, -id) list ordering.
+        indexes = [
+            models.Index(fields=['project', 'status', 'rank'], name='task_project_status_rank_idx'),
+            models.Index(fields=['project', 'due_date'], name='task_project_due_idx'),
+            models.Index(fields=['project', 'updated_at'], name='task_project_updated_idx'),
+            models.Index(fields=['assigned_to', 'status', 'due_date'], name='task_assignee_status_due_idx'),
+            models.Index(fields=['workspace', 'status', 'due_date'], name='task_workspace_status_due_idx'),
+            models.Index(fields=['workspace', 'updated_at'], name='task_workspace_updated_idx'),
+            models.Index(fields=['workspace', 'due_date'], name='task_workspace_due_idx'),
+            models.Index(fields=['workspace', 'change_seq'], name='task_workspace_change_seq_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        # The position as loaded, so a save can tell the task left its column.
+        if all(field in task.__dict__ for field in ('project_id', 'status', 'rank')):
+            task._loaded_position = (task.project_id, task.status, task.rank)
+        return task
+
+    def left_column(self):
+        """
+        True if the project or status changed since loading while the rank
+        did not, so the rank belongs to the old column.
+        """
+        loaded = getattr(self, '_loaded_position', None)
+        if loaded is None:
+            return False
+        project_id, status, rank = loaded
+        return self.rank == rank and (self.project_id, self.status) != (project_id, status)
+
+    def save(self, *args, **kwargs):
+        if self.project_id is not None:
+            self.workspace_id = self.project.workspace_id
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'project' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'workspace'}
+        if self.left_column():
+            # Go to the end of the new column.
+            self.rank = ''
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'rank'}
+        if not self.rank:
+            Task.assign_ranks([self])
+        super().save(*args, **kwargs)
+        self._loaded_position = (self.project_id, self.status, self.rank)
+
+    @staticmethod
+    def last_rank(project_id, status, exclude=None):
+        """The highest rank in a (project, status) column, or None if it is empty."""
+        tasks = Task.objects.filter(project_id=project_id, status=status)
+        if exclude is not None:
+            tasks = tasks.exclude(pk=exclude)
+        return tasks.aggregate(last=models.Max('rank'))['last'] or None
+
+    @staticmethod
+    def assign_ranks(tasks):
+        """
+        Rank every unranked task in ``tasks`` after the current end of its
+        (project, status) column, in list order; one query per column.
+        """
+        last_ranks = {}
+        for task in tasks:
+            if task.rank:
+                continue
+            column = (task.project_id, task.status)
+            if column not in last_ranks:
+                last_ranks[column] = Task.last_rank(*column, exclude=task.pk)
+            task.rank = last_ranks[column] = rank_between(last_ranks[column], None)
+
     def __str__(self):
         return self.title
+
+
+class TaskCounter(models.Model):
+    """
+    Number of tasks in one (project, status, due_date) bucket, maintained
+    incrementally by workspace.changes. Overdue counts depend on the
+    clock rather than on writes, so they are derived at read time from
+    the due-date buckets instead of being stored.
+    """
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='+')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=50)
+    due_date = models.DateField(blank=True, null=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['project', 'status', 'due_date'], name='task_counter_bucket',
+            ),
+            # NULLs are distinct in the constraint above.
+            models.UniqueConstraint(
+                fields=['project', 'status'], condition=models.Q(due_date__isnull=True),
+                name='task_counter_undated_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['workspace', 'status'], name='task_counter_workspace_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id}/{self.status}/{self.due_date}: {self.count}"
+
+
+class TaskDeletion(models.Model):
+    """Tombstone for a hard-deleted task, read by the delta sync endpoint."""
+    task_id = models.BigIntegerField()
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='+')
+    project_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    change_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['workspace', 'change_seq'], name='task_deletion_change_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id} deleted at {self.deleted_at}"
+
+
+class ChangeSequence(models.Model):
+    """
+    Single-row counter ordering task writes and tombstones for delta
+    sync. Writers advance it inside their transaction, and the row lock
+    that takes holds the next writer back until commit, so values become
+    visible in increasing order (see ``workspace.sync``).
+    """
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.value)
+
+
+class TaskActivity(models.Model):
+    """
+    Append-only, field-level history of task writes, buffered and
+    written by workspace.activity. ``changes`` maps each changed field
+    to ``[old, new]``. Task and project are plain ids so history
+    outlives the rows it describes.
+    """
+    ACTIONS = [('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')]
+
+    task_id = models.BigIntegerField()
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='+')
+    project_id = models.BigIntegerField()
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    changes = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['task_id', 'created_at'], name='task_activity_task_idx'),
+            models.Index(fields=['workspace', 'created_at'], name='task_activity_workspace_idx'),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id} {self.action} at {self.created_at}"
+
+
+class Job(models.Model):
+    """
+    A queued call of one of ``workspace.jobs.JOB_HANDLERS``, run by the
+    ``run_jobs`` worker. Finished jobs are deleted; failed ones are kept.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    state = models.CharField(max_length=20, choices=STATES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Lease of the worker running the job; past it, the job is reclaimed.
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'run_after'], name='job_state_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.state})"
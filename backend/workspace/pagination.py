@@ -0,0 +1,168 @@
+import base64
+import json
+from functools import reduce
+import operator
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite, unique ordering such as
+    ``('-updated_at', '-id')``.
+
+    Each page is fetched with a ``WHERE (a, b) < (x, y)`` style filter
+    instead of an OFFSET, so page N costs the same as page 1 and no
+    ``COUNT(*)`` is issued. Cursors are opaque base64 tokens holding the
+    ordering values of the row at the page boundary. The last ordering
+    field must be unique and none of the fields may be nullable.
+
+    Views pick their ordering with a ``cursor_ordering`` attribute, or a
+    ``get_cursor_ordering()`` method when it depends on the request.
+    """
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        The unevaluated queryset for the requested page, including one
+        extra row that tells whether another page follows.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.base_url = request.build_absolute_uri()
+
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+        queryset = queryset.order_by(*self._order_by(self.reverse))
+        if self.position is not None:
+            queryset = queryset.filter(self._after(self.position, self.reverse))
+        return queryset[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        results = list(self.get_page_queryset(queryset, request, view))
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = self.position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, view):
+        if hasattr(view, 'get_cursor_ordering'):
+            return tuple(view.get_cursor_ordering())
+        return tuple(getattr(view, 'cursor_ordering', self.ordering))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    # Cursor encoding
+
+    def encode_cursor(self, item, reverse):
+        values = [self._value(item, name.lstrip('-')) for name in self.ordering]
+        payload = json.dumps({'p': values, 'r': reverse}, default=_json_default)
+        token = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            values, reverse = payload['p'], bool(payload['r'])
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                self._to_python(model, name.lstrip('-'), value)
+                for name, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    # Query building
+
+    def _order_by(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+
+    def _after(self, position, reverse):
+        return keyset_filter(self.ordering, position, reverse)
+
+    @staticmethod
+    def _value(item, name):
+        if isinstance(item, dict):
+            return item[name]
+        return getattr(item, name)
+
+    @staticmethod
+    def _to_python(model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+
+def keyset_filter(ordering, position, reverse=False):
+    """
+    Q object selecting the rows that come after ``position`` (one value
+    per ``ordering`` field) in ``ordering``, or before it if ``reverse``.
+    """
+    clauses = []
+    for index, name in enumerate(ordering):
+        descending = name.startswith('-') != reverse
+        field = name.lstrip('-')
+        clause = Q(**{f'{field}__lt' if descending else f'{field}__gt': position[index]})
+        for prefix_name, prefix_value in zip(ordering[:index], position):
+            clause &= Q(**{prefix_name.lstrip('-'): prefix_value})
+        clauses.append(clause)
+    return reduce(operator.or_, clauses)
+
+
+def _json_default(value):
+    # isoformat() keeps microseconds, which DjangoJSONEncoder would truncate.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import permissions
+
+from .models import Workspace, WorkspaceMember
+
+ROLE_CACHE_KEY = 'workspace_roles:{user_id}'
+
+
+def _role_cache_key(user_id):
+    return ROLE_CACHE_KEY.format(user_id=user_id)
+
+
+def get_workspace_roles(request):
+    """
+    Return ``{workspace_id: role}`` for ``request.user``.
+
+    Workspace creators always resolve to ``'admin'``. The map is memoized
+    on the request and cached across requests until a membership of the
+    user changes (see ``invalidate_workspace_roles``).
+    """
+    roles = getattr(request, '_workspace_roles', None)
+    if roles is not None:
+        return roles
+
+    user = request.user
+    key = _role_cache_key(user.pk)
+    roles = cache.get(key)
+    if roles is None:
+        roles = {}
+        memberships = WorkspaceMember.objects.filter(user=user).values_list(
+            'workspace_id', 'role', 'workspace__created_by_id'
+        )
+        for workspace_id, role, created_by_id in memberships:
+            roles[workspace_id] = 'admin' if created_by_id == user.pk else role
+        cache.set(key, roles, getattr(settings, 'WORKSPACE_ROLE_CACHE_TIMEOUT', 300))
+
+    request._workspace_roles = roles
+    return roles
+
+
+def invalidate_workspace_roles(*user_ids):
+    cache.delete_many([_role_cache_key(user_id) for user_id in user_ids])
+
+
+def workspace_id_of(obj):
+    if isinstance(obj, Workspace):
+        return obj.pk
+    return obj.workspace_id
+
+
+class IsWorkspaceMember(permissions.IsAuthenticated):
+    """
+    Object-level access check against the cached role map. Actions listed
+    in the view's ``admin_actions`` additionally require the admin role.
+    """
+    message = 'You are not a member of this workspace.'
+    admin_message = 'Only workspace admins can perform this action.'
+
+    def has_object_permission(self, request, view, obj):
+        role = get_workspace_roles(request).get(workspace_id_of(obj))
+        if role is None:
+            return False
+        if view.action in getattr(view, 'admin_actions', ()) and role != 'admin':
+            self.message = self.admin_message
+            return False
+        return True
@@ -0,0 +1,58 @@
+"""
+Background removal of deleted workspaces and projects.
+
+Deleting either through the API only marks it with ``deleted_at``, which
+hides it and everything in it at once, and queues one of the jobs below
+(see ``workspace.jobs``). They delete the children in chunks of
+``PURGE_CHUNK_SIZE`` rows, each chunk in its own short transaction, so
+other writers never wait long for the SQLite write lock, and finish with
+the row itself. Both can be re-run after an interruption.
+"""
+from django.db import transaction
+
+from .models import (
+    Project, Task, TaskActivity, TaskCounter, TaskDeletion, Workspace, WorkspaceMember,
+)
+from .sync import next_change_seq
+
+PURGE_CHUNK_SIZE = 1000
+
+
+def _delete_in_chunks(queryset, on_delete=None):
+    """Delete ``queryset`` a chunk at a time; ``on_delete(ids)`` runs in each chunk's transaction."""
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by().values_list('id', flat=True)[:PURGE_CHUNK_SIZE])
+            if not ids:
+                return deleted
+            if on_delete is not None:
+                on_delete(ids)
+            queryset.model.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+
+
+def purge_project(project_id):
+    project = Project.objects.filter(id=project_id, deleted_at__isnull=False).first()
+    if project is None:
+        return
+
+    def tombstones(task_ids):
+        # Delta sync clients learn of the tasks going; counters were
+        # dropped when the project was marked.
+        seq = next_change_seq()
+        TaskDeletion.objects.bulk_create(
+            TaskDeletion(task_id=task_id, workspace_id=project.workspace_id, project_id=project.id, change_seq=seq)
+            for task_id in task_ids
+        )
+
+    _delete_in_chunks(Task.objects.filter(project_id=project.id), on_delete=tombstones)
+    project.delete()
+
+
+def purge_workspace(workspace_id):
+    if not Workspace.objects.filter(id=workspace_id, deleted_at__isnull=False).exists():
+        return
+    for model in (Task, TaskActivity, TaskDeletion, TaskCounter, Project, WorkspaceMember):
+        _delete_in_chunks(model.objects.filter(workspace_id=workspace_id))
+    Workspace.objects.filter(id=workspace_id).delete()
@@ -0,0 +1,111 @@
+"""
+Fractional indexing for the order of tasks within a board column.
+
+A rank is a string of base-36 digits (``0-9a-z``, lowercase only so byte
+order and case-insensitive collations agree) read as the fraction
+``0.<digits>``. Between any two ranks there is always another, so moving
+a task only rewrites that task's rank. Ranks never end in ``0``, which
+keeps room below every rank.
+
+Appending after the last rank (or prepending before the first) steps by
+an amount that shrinks with the square of the room left, so ranks grow
+only logarithmically with the number of appends: 50,000 appends to one
+column need at most six digits.
+
+Repeated inserts between the same two neighbours still make ranks grow
+by about one digit per few inserts; once a column holds a rank longer than
+``REBALANCE_RANK_LENGTH`` it is rewritten with short, evenly spaced ranks
+in the background (see ``workspace.rebalance``). A move that would still
+pass ``RANK_MAX_LENGTH`` rebalances the column on the spot.
+"""
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+RANK_MAX_LENGTH = 64
+REBALANCE_RANK_LENGTH = 24
+
+
+def is_valid_rank(rank):
+    return (
+        isinstance(rank, str) and 0 < len(rank) <= RANK_MAX_LENGTH
+        and not rank.endswith('0') and all(char in DIGITS for char in rank)
+    )
+
+
+def rank_between(low, high):
+    """
+    A rank strictly between ``low`` and ``high``. Either may be ``None``
+    (or empty) for the start or end of the column.
+    """
+    if low and high and low >= high:
+        raise ValueError(f'{low!r} does not sort before {high!r}')
+    if low and not high:
+        return _after(low)
+    if high and not low:
+        return _before(high)
+    return _midpoint(low or '', high or None)
+
+
+def _step_position(rank, digit):
+    # Index of the digit to step: twice as deep as the run of ``digit``
+    # that rank starts with, so the step is about the square of the room
+    # left before 1 (or 0) and that room shrinks polynomially, not
+    # geometrically.
+    run = len(rank) - len(rank.lstrip(digit))
+    return 2 * run + 1
+
+
+def _after(low):
+    width = _step_position(low, DIGITS[-1]) + 1
+    value = _decode(low[:width].ljust(width, '0')) + 1
+    return _encode(value, width)
+
+
+def _before(high):
+    width = _step_position(high, '0') + 1
+    value = _decode(high[:width].ljust(width, '0'))
+    if len(high.rstrip('0')) <= width:
+        # ``high`` fits in ``width`` digits, so step below it.
+        value -= 1
+    return _encode(value, width)
+
+
+def _midpoint(low, high):
+    # ``low`` may be '' (zero); ``high`` of None stands for one.
+    if high is not None:
+        prefix = 0
+        while prefix < len(high) and (low[prefix] if prefix < len(low) else '0') == high[prefix]:
+            prefix += 1
+        if prefix:
+            return high[:prefix] + _midpoint(low[prefix:], high[prefix:])
+
+    low_digit = DIGITS.index(low[0]) if low else 0
+    high_digit = DIGITS.index(high[0]) if high is not None else BASE
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit) // 2]
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[low_digit] + _midpoint(low[1:], None)
+
+
+def spaced_ranks(count):
+    """``count`` increasing ranks of minimal length, spread evenly."""
+    length = 1
+    while BASE ** length <= count:
+        length += 1
+    step = BASE ** length / (count + 1)
+    return [_encode(round(step * (index + 1)), length) for index in range(count)]
+
+
+def _decode(digits):
+    value = 0
+    for char in digits:
+        value = value * BASE + DIGITS.index(char)
+    return value
+
+
+def _encode(value, length):
+    digits = []
+    for _ in range(length):
+        value, digit = divmod(value, BASE)
+        digits.append(DIGITS[digit])
+    return ''.join(reversed(digits)).rstrip('0')
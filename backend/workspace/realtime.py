@@ -0,0 +1,248 @@
+"""
+Real-time task and project events over WebSockets.
+
+``websocket_application`` is a plain ASGI app mounted at ``/ws/tasks/`` by
+``backend.asgi``. Clients connect with ``?token=<access JWT>`` and are
+subscribed to every workspace they belong to at connect time (reconnect
+to pick up workspaces joined later). A socket stops receiving a
+workspace's events once the workspace is deleted or the user is removed
+from it.
+
+Writes publish events through ``get_broker()`` once their transaction
+commits. The broker class comes from ``settings.REALTIME_BROKER`` and
+defaults to ``LocalBroker``, which only reaches sockets served by the
+same process. Multi-process deployments can plug in a backend with the
+same ``publish``/``subscribe``/``unsubscribe`` interface built on a
+shared pub/sub system.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import WorkspaceMember
+
+WEBSOCKET_PATH = '/ws/tasks/'
+
+# Close codes in the 4000-4999 range are free for application use.
+CLOSE_UNAUTHORIZED = 4401
+
+
+class Subscription:
+    def __init__(self, workspace_ids):
+        self.workspace_ids = set(workspace_ids)
+        self.queue = asyncio.Queue()
+
+
+class LocalBroker:
+    """
+    In-process pub/sub. ``publish`` may be called from any thread; events
+    are buffered and delivered to subscribers once per ``tick`` seconds,
+    with repeated events for the same object within a tick coalesced
+    into one.
+    """
+
+    def __init__(self, tick=0.1):
+        self.tick = tick
+        self._lock = threading.Lock()
+        self._loop = None
+        self._subscribers = defaultdict(set)
+        self._pending = defaultdict(dict)
+        self._flush_scheduled = False
+
+    async def subscribe(self, workspace_ids):
+        subscription = Subscription(workspace_ids)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            for workspace_id in subscription.workspace_ids:
+                self._subscribers[workspace_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription, workspace_ids=None):
+        """Drop ``subscription`` from ``workspace_ids``, or from all of its workspaces."""
+        workspace_ids = set(subscription.workspace_ids if workspace_ids is None else workspace_ids)
+        with self._lock:
+            for workspace_id in workspace_ids & subscription.workspace_ids:
+                self._subscribers[workspace_id].discard(subscription)
+                if not self._subscribers[workspace_id]:
+                    del self._subscribers[workspace_id]
+            subscription.workspace_ids -= workspace_ids
+            if not self._subscribers:
+                # Nobody is listening; forget the loop, which may be closing.
+                self._loop = None
+                self._pending.clear()
+                self._flush_scheduled = False
+
+    def publish(self, workspace_id, event):
+        with self._lock:
+            if workspace_id not in self._subscribers or self._loop is None:
+                return
+            pending = self._pending[workspace_id]
+            key = (event['model'], event['id'])
+            previous = pending.get(key)
+            if previous is not None and previous['action'] == 'created' and event['action'] == 'updated':
+                event = {**event, 'action': 'created'}
+            pending[key] = event
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._loop.call_soon_threadsafe(self._loop.call_later, self.tick, self._flush)
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(dict)
+            self._flush_scheduled = False
+            deliveries = [
+                (subscription, list(events.values()))
+                for workspace_id, events in pending.items()
+                for subscription in self._subscribers.get(workspace_id, ())
+            ]
+        for subscription, events in deliveries:
+            subscription.queue.put_nowait(events)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'REALTIME_BROKER', 'workspace.realtime.LocalBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def task_event(action, snapshot):
+    return {
+        'model': 'task', 'action': action, 'id': snapshot['id'],
+        'workspace': snapshot['workspace_id'], 'data': snapshot,
+    }
+
+
+def project_event(action, project, workspace_id=None):
+    workspace_id = project.workspace_id if workspace_id is None else workspace_id
+    return {
+        'model': 'project', 'action': action, 'id': project.pk, 'workspace': workspace_id,
+        'data': {
+            'id': project.pk, 'workspace_id': project.workspace_id, 'name': project.name,
+            'description': project.description, 'image_url': project.image_url,
+            'updated_at': project.updated_at,
+        },
+    }
+
+
+def workspace_event(action, workspace):
+    return {
+        'model': 'workspace', 'action': action, 'id': workspace.pk, 'workspace': workspace.pk,
+        'data': {'id': workspace.pk, 'name': workspace.name},
+    }
+
+
+def member_event(action, member):
+    return {
+        'model': 'member', 'action': action, 'id': member.user_id, 'workspace': member.workspace_id,
+        'data': {'user_id': member.user_id, 'role': member.role},
+    }
+
+
+def _revoked_workspaces(events, user_id):
+    """Workspaces that ``events`` take out of ``user_id``'s reach."""
+    return {
+        event['workspace'] for event in events
+        if event['action'] == 'deleted' and (
+            event['model'] == 'workspace' or (event['model'] == 'member' and event['id'] == user_id)
+        )
+    }
+
+
+def publish_on_commit(events):
+    """
+    Hand ``events`` to the broker once the current transaction commits. A
+    broker failure is logged and does not fail the request or stop later
+    on-commit callbacks.
+    """
+    events = list(events)
+    if not events:
+        return
+
+    def publish():
+        broker = get_broker()
+        for event in events:
+            broker.publish(event['workspace'], event)
+
+    transaction.on_commit(publish, robust=True)
+
+
+async def _authenticate(scope):
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    if not token:
+        return None
+    try:
+        user_id = AccessToken(token)[jwt_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+    return await get_user_model().objects.filter(
+        **{jwt_settings.USER_ID_FIELD: user_id, 'is_active': True}
+    ).afirst()
+
+
+async def websocket_application(scope, receive, send):
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    user = await _authenticate(scope)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    workspace_ids = [
+        workspace_id async for workspace_id in
+        WorkspaceMember.objects.filter(user=user).values_list('workspace_id', flat=True)
+    ]
+    # Subscribe before accepting so nothing committed after the handshake is missed.
+    broker = get_broker()
+    subscription = await broker.subscribe(workspace_ids)
+    receiver = getter = None
+    try:
+        await send({'type': 'websocket.accept'})
+        receiver = asyncio.ensure_future(receive())
+        getter = asyncio.ensure_future(subscription.queue.get())
+        while True:
+            done, _ = await asyncio.wait({receiver, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                if receiver.result()['type'] == 'websocket.disconnect':
+                    break
+                # Client messages carry no meaning yet; keep listening.
+                receiver = asyncio.ensure_future(receive())
+            if getter in done:
+                events = getter.result()
+                revoked = _revoked_workspaces(events, user.pk)
+                if revoked:
+                    broker.unsubscribe(subscription, revoked)
+                    # The revoking events go out; nothing else from those workspaces does.
+                    events = [
+                        event for event in events
+                        if event['workspace'] not in revoked or event['model'] in ('workspace', 'member')
+                    ]
+                payload = {'type': 'events', 'events': events}
+                await send({'type': 'websocket.send', 'text': json.dumps(payload, cls=DjangoJSONEncoder)})
+                getter = asyncio.ensure_future(subscription.queue.get())
+    finally:
+        for future in (receiver, getter):
+            if future is not None:
+                future.cancel()
+        broker.unsubscribe(subscription)
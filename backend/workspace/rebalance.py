@@ -0,0 +1,55 @@
+"""
+Rank rebalancing for board columns (see ``workspace.ranks``).
+"""
+from django.db import transaction
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from .changes import record_task_changes, task_snapshot
+from .jobs import enqueue
+from .models import Task
+from .ranks import REBALANCE_RANK_LENGTH, spaced_ranks
+
+
+def rebalance_column(project_id, status):
+    """
+    Rewrite the ranks of one (project, status) column with short, evenly
+    spaced ones, keeping the current order. Returns the number of tasks
+    whose rank changed.
+    """
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update()
+            .filter(project_id=project_id, status=status).order_by('rank', 'id')
+        )
+        now = timezone.now()
+        changed = []
+        for task, rank in zip(tasks, spaced_ranks(len(tasks))):
+            if task.rank != rank:
+                changed.append((task_snapshot(task), task))
+                task.rank, task.updated_at = rank, now
+        Task.objects.bulk_update([task for _, task in changed], ['rank', 'updated_at'], batch_size=500)
+        record_task_changes(updated=changed)
+    return len(changed)
+
+
+def rebalance_long_ranks():
+    """Rebalance every column holding a rank longer than ``REBALANCE_RANK_LENGTH``."""
+    columns = list(
+        Task.objects.annotate(rank_length=Length('rank'))
+        .filter(rank_length__gt=REBALANCE_RANK_LENGTH)
+        .values_list('project_id', 'status').distinct()
+    )
+    return sum(rebalance_column(project_id, status) for project_id, status in columns)
+
+
+def schedule_rebalance(project_id, status):
+    """Queue a rebalance of a column for the ``run_jobs`` worker."""
+    enqueue('rebalance_column', unique=True, project_id=project_id, status=status)
+
+
+def rebalance_if_needed(tasks):
+    """Schedule a rebalance of each column in which one of ``tasks`` got a long rank."""
+    columns = {(task.project_id, task.status) for task in tasks if len(task.rank) > REBALANCE_RANK_LENGTH}
+    for project_id, status in columns:
+        schedule_rebalance(project_id, status)
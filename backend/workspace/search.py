@@ -0,0 +1,119 @@
+"""
+Full-text search over task titles and descriptions.
+
+SQLite uses the ``workspace_task_fts`` FTS5 table (kept in sync with
+``workspace_task`` by triggers), PostgreSQL uses a GIN index over
+``TASK_SEARCH_VECTOR``. Both are created by migration 0003. Any other
+backend falls back to ``icontains``.
+"""
+import functools
+import re
+import sqlite3
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Must stay identical to the expression indexed by migration 0003.
+TASK_SEARCH_VECTOR = (
+    "to_tsvector('english', coalesce(workspace_task.title, '') || ' ' || "
+    "coalesce(workspace_task.description, ''))"
+)
+
+
+SQLITE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER workspace_task_fts_insert AFTER INSERT ON workspace_task BEGIN
+        INSERT INTO workspace_task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER workspace_task_fts_delete AFTER DELETE ON workspace_task BEGIN
+        INSERT INTO workspace_task_fts(workspace_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER workspace_task_fts_update AFTER UPDATE OF title, description ON workspace_task BEGIN
+        INSERT INTO workspace_task_fts(workspace_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO workspace_task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+SQLITE_FTS_DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS workspace_task_fts_update",
+    "DROP TRIGGER IF EXISTS workspace_task_fts_delete",
+    "DROP TRIGGER IF EXISTS workspace_task_fts_insert",
+]
+
+
+def restore_sqlite_search_triggers(apps, schema_editor):
+    """
+    Migration helper. SQLite rebuilds ``workspace_task`` for most ALTERs,
+    which silently drops its triggers, so any migration that alters the
+    task table must run this afterwards to reinstall them and reindex.
+    """
+    if schema_editor.connection.vendor != 'sqlite' or not fts5_available():
+        return
+    for statement in SQLITE_FTS_DROP_TRIGGERS + SQLITE_FTS_TRIGGERS:
+        schema_editor.execute(statement)
+    schema_editor.execute("INSERT INTO workspace_task_fts(workspace_task_fts) VALUES ('rebuild')")
+
+
+@functools.lru_cache(maxsize=None)
+def fts5_available():
+    """Whether the linked SQLite library was built with FTS5."""
+    probe = sqlite3.connect(':memory:')
+    try:
+        probe.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def search_tasks(queryset, query):
+    """
+    Restrict ``queryset`` to tasks matching ``query`` and annotate each
+    row with ``search_rank``. Lower ranks are better matches, so ordering
+    by ``('search_rank', 'id')`` lists the best matches first.
+    """
+    if connection.vendor == 'sqlite' and fts5_available():
+        return _search_fts5(queryset, query)
+    if connection.vendor == 'postgresql':
+        return _search_postgres(queryset, query)
+    return queryset.filter(
+        Q(title__icontains=query) | Q(description__icontains=query)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def _search_fts5(queryset, query):
+    # Quote every term so user input can't inject FTS5 syntax, and
+    # prefix-match them so partially typed words still find results.
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    match = ' '.join(f'"{term}"*' for term in terms)
+
+    # Join the FTS table once so MATCH runs a single time; bm25() then
+    # reads the rank of the joined row. A correlated subquery per task
+    # would re-run the MATCH for every result.
+    return queryset.extra(
+        tables=['workspace_task_fts'],
+        where=['workspace_task_fts.rowid = workspace_task.id', 'workspace_task_fts MATCH %s'],
+        params=[match],
+    ).annotate(search_rank=RawSQL('bm25(workspace_task_fts)', (), output_field=FloatField()))
+
+
+def _search_postgres(queryset, query):
+    tsquery = "websearch_to_tsquery('english', %s)"
+    return queryset.filter(
+        RawSQL(f"{TASK_SEARCH_VECTOR} @@ {tsquery}", (query,), output_field=BooleanField())
+    ).annotate(search_rank=RawSQL(
+        f"-ts_rank({TASK_SEARCH_VECTOR}, {tsquery})", (query,), output_field=FloatField()
+    ))
@@ -1,16 +1,86 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Workspace, WorkspaceMember, Project, Task
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .models import Workspace, WorkspaceMember, Project, Task, TaskActivity
+from .permissions import get_workspace_roles
+from .ranks import RANK_MAX_LENGTH, is_valid_rank
+from . import values
+from .sparse import SparseFieldsMixin
 
 User = get_user_model()
 
+
+def ensure_workspace_member(request, workspace_id):
+    if workspace_id not in get_workspace_roles(request):
+        raise serializers.ValidationError('You are not a member of this workspace.')
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves pks from ``prefetched`` (``{pk: instance}``, filled in by
+    ``BulkCreateListSerializer``) when set, instead of one query per value.
+    """
+    prefetched = None
+
+    def to_internal_value(self, data):
+        if self.prefetched is None:
+            return super().to_internal_value(data)
+        pk = _to_pk(self.get_queryset().model, data)
+        if pk is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.prefetched[pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+def _to_pk(model, value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except (DjangoValidationError, TypeError, ValueError):
+        return None
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    ``many=True`` create: every foreign key field of the child is checked
+    with one ``IN`` query for the whole list, and the rows are inserted
+    with one ``bulk_create`` in input order. Children may define
+    ``prepare_bulk_create(instances)`` to fill in fields that ``save()``
+    would.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._prefetch_related(data)
+        return super().to_internal_value(data)
+
+    def _prefetch_related(self, data):
+        for name, field in self.child.fields.items():
+            if not isinstance(field, PrefetchedPrimaryKeyRelatedField) or field.read_only:
+                continue
+            model = field.get_queryset().model
+            pks = {_to_pk(model, item.get(name)) for item in data if isinstance(item, dict)}
+            pks.discard(None)
+            field.prefetched = field.get_queryset().in_bulk(pks) if pks else {}
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        instances = [model(**attrs) for attrs in validated_data]
+        if hasattr(self.child, 'prepare_bulk_create'):
+            self.child.prepare_bulk_create(instances)
+        return model.objects.bulk_create(instances)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
         read_only_fields = ['id', 'username', 'email']
 
-class WorkspaceSerializer(serializers.ModelSerializer):
+class WorkspaceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     class Meta:
         model = Workspace
@@ -22,41 +92,138 @@ class WorkspaceCreateSerializer(serializers.ModelSerializer):
         model = Workspace
         fields = ['name', 'image_url']
 
-class WorkspaceMemberSerializer(serializers.ModelSerializer):
+class WorkspaceMemberSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     class Meta:
         model = WorkspaceMember
         fields = ['id', 'user', 'role']
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     workspace = serializers.StringRelatedField(read_only=True)
+    expandable_fields = {'workspace': WorkspaceSerializer}
     class Meta:
         model = Project
         fields = ['id', 'workspace', 'name', 'description', 'image_url', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
 class ProjectCreateSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     class Meta:
         model = Project
         fields = ['workspace', 'name', 'description', 'image_url']
+        list_serializer_class = BulkCreateListSerializer
+        extra_kwargs = {'workspace': {'queryset': Workspace.objects.filter(deleted_at__isnull=True)}}
 
-class TaskSerializer(serializers.ModelSerializer):
+    def validate_workspace(self, workspace):
+        ensure_workspace_member(self.context['request'], workspace.id)
+        return workspace
+
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     project = serializers.StringRelatedField(read_only=True)
     assigned_to = UserSerializer(read_only=True)
+    expandable_fields = {'project': ProjectSerializer}
     class Meta:
         model = Task
-        fields = ['id', 'project', 'title', 'description', 'assigned_to', 'status', 'due_date', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'project', 'title', 'description', 'assigned_to', 'status', 'due_date', 'rank', 'created_at', 'updated_at']
+        read_only_fields = ['rank', 'created_at', 'updated_at']
 
-class TaskDetailSerializer(serializers.ModelSerializer):
+class TaskDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     project = ProjectSerializer(read_only=True)
     assigned_to = UserSerializer(read_only=True)
     class Meta:
         model = Task
-        fields = ['id', 'project', 'title', 'description', 'assigned_to', 'status', 'due_date', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'project', 'title', 'description', 'assigned_to', 'status', 'due_date', 'rank', 'created_at', 'updated_at']
+        read_only_fields = ['rank', 'created_at', 'updated_at']
 
 class TaskCreateSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     class Meta:
         model = Task
         fields = ['project', 'title', 'description', 'assigned_to', 'status', 'due_date']
+        list_serializer_class = BulkCreateListSerializer
+        extra_kwargs = {'project': {'queryset': Project.objects.filter(deleted_at__isnull=True)}}
+
+    def validate_project(self, project):
+        ensure_workspace_member(self.context['request'], project.workspace_id)
+        return project
+
+    def prepare_bulk_create(self, tasks):
+        # bulk_create skips Task.save(), which normally does this.
+        for task in tasks:
+            task.workspace_id = task.project.workspace_id
+        Task.assign_ranks(tasks)
+
+class TaskBulkUpdateItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField(max_length=200, required=False)
+    description = serializers.CharField(allow_blank=True, allow_null=True, required=False)
+    assigned_to = serializers.IntegerField(allow_null=True, required=False)
+    status = serializers.ChoiceField(choices=Task._meta.get_field('status').choices, required=False)
+    due_date = serializers.DateField(allow_null=True, required=False)
+    rank = serializers.CharField(max_length=RANK_MAX_LENGTH, required=False)
+
+    def validate_rank(self, rank):
+        if not is_valid_rank(rank):
+            raise serializers.ValidationError('Ranks use the digits 0-9a-z and must not end in 0.')
+        return rank
+
+
+class TaskActivitySerializer(serializers.ModelSerializer):
+    actor = UserSerializer(read_only=True)
+    class Meta:
+        model = TaskActivity
+        fields = ['id', 'task_id', 'project_id', 'actor', 'action', 'changes', 'created_at']
+
+class TaskMoveSerializer(serializers.Serializer):
+    """Place a task between two neighbours of its (target) column, or at its end."""
+    after = serializers.IntegerField(allow_null=True, required=False)
+    before = serializers.IntegerField(allow_null=True, required=False)
+    status = serializers.ChoiceField(choices=Task._meta.get_field('status').choices, required=False)
+
+
+# values()-based list serializers; each must match the serializer it mirrors.
+
+def user_values(key):
+    return values.Nested(key, {
+        'id': values.Field(f'{key}__id'),
+        'username': values.Field(f'{key}__username'),
+        'email': values.Field(f'{key}__email'),
+    })
+
+class WorkspaceValuesSerializer(values.ValuesSerializer):
+    fields = {
+        'id': values.Field('id'),
+        'name': values.Field('name'),
+        'created_by': user_values('created_by'),
+        'image_url': values.Field('image_url'),
+        'invite_link': values.Field('invite_link'),
+    }
+
+class ProjectValuesSerializer(values.ValuesSerializer):
+    fields = {
+        'id': values.Field('id'),
+        'workspace': values.Field('workspace__name'),
+        'name': values.Field('name'),
+        'description': values.Field('description'),
+        'image_url': values.Field('image_url'),
+        'created_at': values.DateTimeField('created_at'),
+        'updated_at': values.DateTimeField('updated_at'),
+    }
+    expansions = {'workspace': WorkspaceValuesSerializer.nested('workspace')}
+
+class TaskValuesSerializer(values.ValuesSerializer):
+    fields = {
+        'id': values.Field('id'),
+        'project': values.Field('project__name'),
+        'title': values.Field('title'),
+        'description': values.Field('description'),
+        'assigned_to': user_values('assigned_to'),
+        'status': values.Field('status'),
+        'due_date': values.DateField('due_date'),
+        'rank': values.Field('rank'),
+        'created_at': values.DateTimeField('created_at'),
+        'updated_at': values.DateTimeField('updated_at'),
+    }
+    expansions = {'project': ProjectValuesSerializer.nested('project')}
@@ -0,0 +1,66 @@
+"""
+Sparse fieldsets and opt-in expansions for read endpoints.
+
+``?fields=id,title,status`` limits a payload to the named top-level keys.
+``?expand=project`` swaps a relation rendered as a short string for the
+full nested object. Unknown names are ignored.
+
+The DRF serializers get this from ``SparseFieldsMixin``, the ``values()``
+list path from ``ValuesSerializer(fields=..., expand=...)``, and views
+using ``SparseFieldsViewMixin`` also defer unrequested columns of the
+model they query.
+"""
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(request, param):
+    """The comma-separated names in query param ``param``, or ``None`` if absent."""
+    value = request.query_params.get(param) if request is not None else None
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    For read serializers. ``expandable_fields`` maps a field name to the
+    serializer class that renders it when expanded. Only applies to the
+    top-level serializer of a request, never to nested ones.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = kwargs.get('context', {}).get('request')
+        if request is None:
+            return
+
+        for name in parse_names(request, EXPAND_PARAM) or ():
+            if name in self.expandable_fields and name in self.fields:
+                self.fields[name] = self.expandable_fields[name](read_only=True)
+
+        fields = parse_names(request, FIELDS_PARAM)
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class SparseFieldsViewMixin:
+    """
+    Defers the ``deferrable_fields`` (model fields rendered under their
+    own name) that a ``?fields=`` read leaves out, so large columns such
+    as descriptions are not fetched for nothing.
+    """
+    deferrable_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != 'GET':
+            return queryset
+        fields = parse_names(self.request, FIELDS_PARAM)
+        if fields is not None:
+            deferred = [name for name in self.deferrable_fields if name not in fields]
+            if deferred:
+                queryset = queryset.defer(*deferred)
+        return queryset
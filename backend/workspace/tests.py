@@ -1,3 +1,1274 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import tempfile
+import warnings
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from backend.asgi import application
+
+from .counters import rebuild_counters
+from .activity import log_task_activity, activity_entry
+from .changes import task_snapshot
+from .jobs import JOB_MAX_ATTEMPTS, claim_job, enqueue, run_job, run_pending_jobs
+from .models import Job, Workspace, WorkspaceMember, Project, Task, TaskActivity, TaskCounter, TaskDeletion
+from .ranks import RANK_MAX_LENGTH, is_valid_rank, rank_between, spaced_ranks
+from .rebalance import rebalance_long_ranks, schedule_rebalance
+from .renderers import FastJSONRenderer
+from .search import fts5_available
+from .serializers import ProjectSerializer, TaskSerializer, WorkspaceSerializer
+from .realtime import CLOSE_UNAUTHORIZED, LocalBroker, websocket_application
+
+User = get_user_model()
+
+
+class WorkspaceAPITestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='pass')
+        self.workspace = self.make_workspace(self.user, 'Main')
+        self.project = Project.objects.create(workspace=self.workspace, name='Board')
+        self.client.force_authenticate(self.user)
+
+    def make_workspace(self, user, name):
+        workspace = Workspace.objects.create(name=name, created_by=user)
+        WorkspaceMember.objects.create(workspace=workspace, user=user, role='admin')
+        return workspace
+
+
+class TaskBulkUpdateTests(WorkspaceAPITestCase):
+    url = '/api/tasks/bulk-update/'
+
+    def test_updates_all_tasks_in_one_write(self):
+        tasks = [Task.objects.create(project=self.project, title=f'Task {i}') for i in range(20)]
+        updates = [{'id': task.id, 'status': 'done', 'position': i} for i, task in enumerate(tasks)]
+        Task.objects.create(project=self.project, title='Already done', status='done')
+        rebuild_counters()
+
+        # Roles, tasks, savepoint, end of the done column, UPDATE, two
+        # counter buckets, change sequence (advance, read, stamp), release.
+        with self.assertNumQueries(11):
+            response = self.client.post(self.url, {'updates': updates}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(result['updated'] for result in response.data['results']))
+        self.assertEqual(Task.objects.filter(status='done').count(), 21)
+
+    def test_reports_per_item_errors(self):
+        task = Task.objects.create(project=self.project, title='Mine')
+        other_task = Task.objects.create(project=self.project, title='Also mine')
+        foreign_workspace = self.make_workspace(self.other, 'Other')
+        foreign_project = Project.objects.create(workspace=foreign_workspace, name='Theirs')
+        foreign_task = Task.objects.create(project=foreign_project, title='Theirs')
+
+        response = self.client.post(self.url, {'updates': [
+            {'id': task.id, 'assigned_to': self.other.id},
+            {'id': foreign_task.id, 'status': 'done'},
+            {'id': task.id, 'status': 'bogus'},
+            {'id': other_task.id, 'assigned_to': 999999},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([result['updated'] for result in results], [True, False, False, False])
+        self.assertIn('id', results[1]['errors'])
+        self.assertIn('status', results[2]['errors'])
+        self.assertIn('assigned_to', results[3]['errors'])
+        task.refresh_from_db()
+        foreign_task.refresh_from_db()
+        self.assertEqual(task.assigned_to, self.other)
+        self.assertEqual(foreign_task.status, 'todo')
+
+    def test_rejects_empty_payload(self):
+        response = self.client.post(self.url, {'updates': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTests(WorkspaceAPITestCase):
+    def test_walks_every_task_exactly_once(self):
+        created = {Task.objects.create(project=self.project, title=f'Task {i}').id for i in range(7)}
+        seen = []
+        url = '/api/tasks/?page_size=3'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+            seen.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(created))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_previous_link_returns_preceding_page(self):
+        for i in range(5):
+            Task.objects.create(project=self.project, title=f'Task {i}')
+        first = self.client.get('/api/tasks/?page_size=2').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertIsNone(first['previous'])
+        self.assertEqual(back['results'], first['results'])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/tasks/?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_members_filter_by_workspace(self):
+        second = self.make_workspace(self.user, 'Second')
+        response = self.client.get(f'/api/members/?workspace={second.id}')
+        self.assertEqual([member['id'] for member in response.data['results']],
+                         list(second.memberships.values_list('id', flat=True)))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class TaskIndexTests(WorkspaceAPITestCase):
+    filter_combinations = [
+        {'project_id': 1},
+        {'project_id': 1, 'status': 'todo'},
+        {'project_id': 1, 'due_date': '2025-01-01'},
+        {'workspace_id': 1},
+        {'workspace_id': 1, 'status': 'todo'},
+        {'workspace_id': 1, 'status': 'todo', 'due_date': '2025-01-01'},
+        {'assigned_to_id': 1},
+        {'assigned_to_id': 1, 'status': 'todo'},
+        {'assigned_to_id': 1, 'status': 'todo', 'due_date': '2025-01-01'},
+        {'project_id': 1, 'assigned_to_id': 1, 'status': 'todo'},
+        {'workspace_id': 1, 'due_date__gte': '2025-01-01', 'due_date__lte': '2025-01-31'},
+        {'project_id': 1, 'due_date__lt': '2025-01-01'},
+    ]
+
+    def test_every_filter_combination_uses_an_index(self):
+        for filters in self.filter_combinations:
+            with self.subTest(filters=filters):
+                plan = Task.objects.filter(**filters).order_by('-updated_at', '-id').explain()
+                self.assertNotIn('SCAN workspace_task', plan)
+                self.assertRegex(plan, r'SEARCH workspace_task USING (COVERING )?INDEX')
+
+
+class TaskSearchTests(WorkspaceAPITestCase):
+    def search(self, query, **params):
+        response = self.client.get('/api/tasks/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [task['title'] for task in response.data['results']]
+
+    def test_matches_title_and_description(self):
+        Task.objects.create(project=self.project, title='Fix login', description='OAuth callback fails')
+        Task.objects.create(project=self.project, title='Write docs', description='Explain the login flow')
+        Task.objects.create(project=self.project, title='Unrelated')
+        self.assertEqual(sorted(self.search('login')), ['Fix login', 'Write docs'])
+        self.assertEqual(self.search('callback'), ['Fix login'])
+
+    def test_prefix_and_combined_filters(self):
+        Task.objects.create(project=self.project, title='Deploy release', status='done')
+        Task.objects.create(project=self.project, title='Deploy hotfix', status='todo')
+        self.assertEqual(self.search('depl', status='todo'), ['Deploy hotfix'])
+
+    def test_index_follows_updates_and_deletes(self):
+        task = Task.objects.create(project=self.project, title='Old name')
+        task.title = 'New name'
+        task.save()
+        self.assertEqual(self.search('old'), [])
+        self.assertEqual(self.search('new'), ['New name'])
+        task.delete()
+        self.assertEqual(self.search('new'), [])
+
+    def test_ranks_better_matches_first(self):
+        Task.objects.create(project=self.project, title='Cache', description='Something about a cache')
+        Task.objects.create(project=self.project, title='Other', description='A long description that mentions cache once')
+        self.assertEqual(self.search('cache')[0], 'Cache')
+
+    def test_query_syntax_is_not_interpreted(self):
+        Task.objects.create(project=self.project, title='Quote "this"')
+        self.assertEqual(self.search('"this" AND OR ('), [])
+        self.assertEqual(self.search('quote "'), ['Quote "this"'])
+
+    def test_search_results_paginate_by_rank(self):
+        for i in range(5):
+            Task.objects.create(project=self.project, title=f'Report {i}')
+        titles, url = [], '/api/tasks/?search=report&page_size=2'
+        while url:
+            response = self.client.get(url)
+            titles.extend(task['title'] for task in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(titles), [f'Report {i}' for i in range(5)])
+
+    @skipUnless(connection.vendor == 'sqlite' and fts5_available(), 'needs SQLite FTS5')
+    def test_rank_comes_from_a_single_match(self):
+        Task.objects.bulk_create(
+            Task(project=self.project, workspace=self.workspace, title=f'Report {i}', rank='h') for i in range(50)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.search('report', page_size=20)), 20)
+        searches = [q['sql'] for q in queries if 'workspace_task_fts' in q['sql']]
+        # A per-row rank subquery would repeat the MATCH (and run it per row).
+        self.assertTrue(searches)
+        self.assertTrue(all(sql.count('MATCH') == 1 for sql in searches))
+
+
+class AccessScopingTests(WorkspaceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        foreign_workspace = self.make_workspace(self.other, 'Other')
+        foreign_project = Project.objects.create(workspace=foreign_workspace, name='Theirs')
+        self.visible = Task.objects.create(project=self.project, title='Mine')
+        Task.objects.create(project=foreign_project, title='Theirs')
+
+    def test_scopes_rows_to_member_workspaces(self):
+        self.assertEqual(list(Workspace.objects.for_user(self.user)), [self.workspace])
+        self.assertEqual(list(Project.objects.for_user(self.user)), [self.project])
+        self.assertEqual(list(Task.objects.for_user(self.user)), [self.visible])
+        self.assertEqual(
+            list(WorkspaceMember.objects.for_user(self.user)),
+            list(self.workspace.memberships.all()),
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+    def test_plans_need_no_distinct(self):
+        old_plan = Task.objects.filter(
+            project__workspace__memberships__user=self.user
+        ).distinct().order_by('-updated_at', '-id').explain()
+        self.assertIn('USE TEMP B-TREE FOR DISTINCT', old_plan)
+
+        for queryset in [
+            Workspace.objects.for_user(self.user).order_by('id'),
+            WorkspaceMember.objects.for_user(self.user).order_by('id'),
+            Project.objects.for_user(self.user).order_by('-updated_at', '-id'),
+            Task.objects.for_user(self.user).order_by('-updated_at', '-id'),
+        ]:
+            with self.subTest(model=queryset.model.__name__):
+                self.assertNotIn('DISTINCT', str(queryset.query))
+                plan = queryset.explain()
+                self.assertNotIn('FOR DISTINCT', plan)
+                self.assertIn('member_user_workspace_idx', plan)
+
+
+class QueryCountTests(WorkspaceAPITestCase):
+    """List endpoints must cost the same number of queries for 2 rows as for 8."""
+
+    def add_rows(self, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='pass')
+            workspace = self.make_workspace(user, f'Workspace {i}')
+            WorkspaceMember.objects.create(workspace=workspace, user=self.user)
+            WorkspaceMember.objects.create(workspace=self.workspace, user=user)
+            project = Project.objects.create(workspace=workspace, name=f'Project {i}')
+            Task.objects.create(project=project, title=f'Task {i}', assigned_to=user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_endpoints_do_not_query_per_row(self):
+        urls = ['/api/workspaces/', '/api/members/', '/api/projects/', '/api/tasks/']
+        self.add_rows(2)
+        small = {url: self.count_queries(url) for url in urls}
+        self.add_rows(6)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), small[url])
+
+    def test_task_detail_is_a_single_query(self):
+        task = Task.objects.create(project=self.project, title='Detail', assigned_to=self.user)
+        self.client.get(f'/api/tasks/{task.id}/')  # warm the role cache
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/tasks/{task.id}/')
+        self.assertEqual(response.data['project']['workspace'], 'Main')
+
+
+class WorkspaceRoleTests(WorkspaceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.member = User.objects.create_user(username='member', email='member@example.com', password='pass')
+        self.membership = WorkspaceMember.objects.create(workspace=self.workspace, user=self.member)
+
+    def test_role_map_is_cached_across_requests(self):
+        self.client.get(f'/api/workspaces/{self.workspace.id}/')
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/workspaces/{self.workspace.id}/')
+
+    def test_members_cannot_run_admin_actions(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.delete(f'/api/workspaces/{self.workspace.id}/')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.patch(f'/api/members/{self.membership.id}/', {'role': 'admin'}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Workspace.objects.filter(id=self.workspace.id).exists())
+
+    def test_creator_counts_as_admin_after_demotion(self):
+        WorkspaceMember.objects.filter(workspace=self.workspace, user=self.user).update(role='member')
+        response = self.client.delete(f'/api/members/{self.membership.id}/')
+        self.assertEqual(response.status_code, 204)
+
+    def test_role_change_invalidates_cached_map(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.delete(f'/api/members/{self.membership.id}/').status_code, 403)
+
+        self.client.force_authenticate(self.user)
+        self.client.patch(f'/api/members/{self.membership.id}/', {'role': 'admin'}, format='json')
+
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.delete(f'/api/members/{self.membership.id}/').status_code, 204)
+
+    def test_join_invalidates_cached_map(self):
+        foreign = self.make_workspace(self.other, 'Other')
+        foreign.invite_link = 'invite-token'
+        foreign.save()
+        project = Project.objects.create(workspace=foreign, name='Theirs')
+        payload = {'project': project.id, 'title': 'New'}
+
+        self.assertEqual(self.client.post('/api/tasks/', payload, format='json').status_code, 400)
+        self.client.post('/api/workspaces/join/', {'invite_link': 'invite-token'}, format='json')
+        self.assertEqual(self.client.post('/api/tasks/', payload, format='json').status_code, 201)
+
+    def test_cannot_create_projects_in_foreign_workspaces(self):
+        foreign = self.make_workspace(self.other, 'Other')
+        response = self.client.post('/api/projects/', {'workspace': foreign.id, 'name': 'Sneaky'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('workspace', response.data)
+
+
+class TaskWorkspaceTests(WorkspaceAPITestCase):
+    def test_workspace_follows_project(self):
+        second = self.make_workspace(self.user, 'Second')
+        other_project = Project.objects.create(workspace=second, name='Other')
+        task = Task.objects.create(project=self.project, title='Moving')
+        self.assertEqual(task.workspace_id, self.workspace.id)
+
+        task.project = other_project
+        task.save(update_fields=['project'])
+        task.refresh_from_db()
+        self.assertEqual(task.workspace_id, second.id)
+
+    def test_moving_a_project_moves_its_tasks(self):
+        second = self.make_workspace(self.user, 'Second')
+        task = Task.objects.create(project=self.project, title='Along for the ride')
+        response = self.client.patch(f'/api/projects/{self.project.id}/', {'workspace': second.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        task.refresh_from_db()
+        self.assertEqual(task.workspace_id, second.id)
+
+    def test_task_scoping_needs_no_join(self):
+        Task.objects.create(project=self.project, title='Scoped')
+        sql = str(Task.objects.for_user(self.user).filter(workspace_id=self.workspace.id).query)
+        self.assertNotIn('JOIN', sql)
+
+
+class TaskCounterTests(WorkspaceAPITestCase):
+    def stats(self, kind, pk):
+        response = self.client.get(f'/api/{kind}/{pk}/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counters_follow_api_writes(self):
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        created = [
+            self.client.post('/api/tasks/', {'project': self.project.id, 'title': f'Task {i}', 'due_date': yesterday}, format='json').data
+            for i in range(3)
+        ]
+        task_ids = list(Task.objects.values_list('id', flat=True))
+        self.assertEqual(len(created), 3)
+
+        self.client.patch(f'/api/tasks/{task_ids[0]}/', {'status': 'done'}, format='json')
+        self.client.post('/api/tasks/bulk-update/', {'updates': [{'id': task_ids[1], 'status': 'in_review'}]}, format='json')
+        self.client.delete(f'/api/tasks/{task_ids[2]}/')
+
+        stats = self.stats('projects', self.project.id)
+        self.assertEqual(stats['total'], 2)
+        self.assertEqual(stats['by_status']['done'], 1)
+        self.assertEqual(stats['by_status']['in_review'], 1)
+        self.assertEqual(stats['by_status']['todo'], 0)
+        self.assertEqual(stats['overdue'], 1)
+        self.assertEqual(self.stats('workspaces', self.workspace.id), stats)
+
+    def test_rebuild_matches_incremental_counts(self):
+        for status_value in ['todo', 'todo', 'backlog']:
+            self.client.post('/api/tasks/', {'project': self.project.id, 'title': 'T', 'status': status_value}, format='json')
+        incremental = self.stats('workspaces', self.workspace.id)
+
+        TaskCounter.objects.all().delete()
+        call_command('rebuild_task_counters', stdout=StringIO())
+        self.assertEqual(self.stats('workspaces', self.workspace.id), incremental)
+        self.assertEqual(incremental['by_status']['todo'], 2)
+
+    def test_stats_are_member_only(self):
+        foreign = self.make_workspace(self.other, 'Other')
+        response = self.client.get(f'/api/workspaces/{foreign.id}/stats/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(WorkspaceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(project=self.project, title='Polled')
+
+    def test_unchanged_list_answers_304_with_one_query(self):
+        first = self.client.get('/api/tasks/')
+        etag = first['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_on_update_delete_and_related_rename(self):
+        etags = [self.client.get('/api/tasks/')['ETag']]
+        self.client.patch(f'/api/tasks/{self.task.id}/', {'status': 'done'}, format='json')
+        etags.append(self.client.get('/api/tasks/')['ETag'])
+        self.client.patch(f'/api/projects/{self.project.id}/', {'name': 'Renamed'}, format='json')
+        etags.append(self.client.get('/api/tasks/')['ETag'])
+        other = Task.objects.create(project=self.project, title='Second')
+        etags.append(self.client.get('/api/tasks/')['ETag'])
+        self.client.delete(f'/api/tasks/{other.id}/')
+        etags.append(self.client.get('/api/tasks/')['ETag'])
+        for before, after in zip(etags, etags[1:]):
+            self.assertNotEqual(before, after)
+
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etags[1])
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etags_cover_rendered_users_and_expansions(self):
+        Task.objects.filter(pk=self.task.pk).update(assigned_to=self.user)
+        etag = self.client.get('/api/tasks/')['ETag']
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['assigned_to']['username'], 'renamed')
+
+        etag = self.client.get('/api/tasks/', {'expand': 'project'})['ETag']
+        self.client.patch(f'/api/workspaces/{self.workspace.id}/', {'name': 'Renamed'}, format='json')
+        response = self.client.get('/api/tasks/', {'expand': 'project'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['project']['workspace'], 'Renamed')
+
+    def test_detail_supports_etag_and_last_modified(self):
+        url = f'/api/tasks/{self.task.id}/'
+        first = self.client.get(url)
+        self.assertIn('Last-Modified', first)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+    def test_workspace_and_member_lists_change_with_their_rows(self):
+        workspace_etag = self.client.get('/api/workspaces/')['ETag']
+        member_etag = self.client.get('/api/members/')['ETag']
+        self.client.patch(f'/api/workspaces/{self.workspace.id}/', {'name': 'Renamed'}, format='json')
+        member = self.workspace.memberships.get()
+        self.client.patch(f'/api/members/{member.id}/', {'role': 'member'}, format='json')
+        self.assertNotEqual(self.client.get('/api/workspaces/')['ETag'], workspace_etag)
+        self.assertNotEqual(self.client.get('/api/members/')['ETag'], member_etag)
+
+
+class TaskSyncTests(WorkspaceAPITestCase):
+    def sync(self, since=None, **params):
+        query = {'workspace': self.workspace.id, **params}
+        if since:
+            query['since'] = since
+        response = self.client.get('/api/tasks/changes/', query)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_initial_sync_then_incremental_changes(self):
+        kept = Task.objects.create(project=self.project, title='Kept')
+        doomed = Task.objects.create(project=self.project, title='Doomed')
+        initial = self.sync()
+        self.assertEqual({task['id'] for task in initial['changed']}, {kept.id, doomed.id})
+        self.assertEqual(initial['deleted'], [])
+
+        self.assertEqual(self.sync(initial['cursor'])['changed'], [])
+
+        self.client.patch(f'/api/tasks/{kept.id}/', {'status': 'done'}, format='json')
+        self.client.delete(f'/api/tasks/{doomed.id}/')
+        delta = self.sync(initial['cursor'])
+        self.assertEqual([task['id'] for task in delta['changed']], [kept.id])
+        self.assertEqual(delta['deleted'], [doomed.id])
+        self.assertEqual(self.sync(delta['cursor'])['changed'], [])
+
+    def test_pages_through_large_deltas(self):
+        for i in range(5):
+            Task.objects.create(project=self.project, title=f'Task {i}')
+        seen, cursor, has_more = [], None, True
+        while has_more:
+            data = self.sync(cursor, limit=2)
+            seen.extend(task['id'] for task in data['changed'])
+            cursor, has_more = data['cursor'], data['has_more']
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_changes_follow_the_sequence_not_timestamps(self):
+        first = Task.objects.create(project=self.project, title='First')
+        cursor = self.sync()['cursor']
+        # A write whose timestamp was taken before the cursor was handed out
+        # but that committed after it.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/tasks/', {'project': self.project.id, 'title': 'Late'}, format='json')
+        late = Task.objects.get(title='Late')
+        Task.objects.filter(pk=late.pk).update(updated_at=first.updated_at - timedelta(seconds=1))
+        delta = self.sync(cursor)
+        self.assertEqual([task['id'] for task in delta['changed']], [late.id])
+        self.assertEqual(self.sync(delta['cursor'])['changed'], [])
+
+        self.client.delete(f'/api/tasks/{late.id}/')
+        TaskDeletion.objects.update(deleted_at=timezone.now() - timedelta(days=1))
+        delta = self.sync(delta['cursor'])
+        self.assertEqual(delta['deleted'], [late.id])
+        self.assertEqual(self.sync(delta['cursor'])['deleted'], [])
+
+    def test_cursor_stays_small_after_a_bulk_import(self):
+        rows = ''.join(f'Board,Task {i}\n' for i in range(30))
+        upload = SimpleUploadedFile('tasks.csv', f'project,title\n{rows}'.encode())
+        response = self.client.post(f'/api/workspaces/{self.workspace.id}/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.data['created'], 30)
+        seen, cursor, has_more = [], None, True
+        while has_more:
+            data = self.sync(cursor, limit=7)
+            seen.extend(task['id'] for task in data['changed'])
+            cursor, has_more = data['cursor'], data['has_more']
+            self.assertLess(len(cursor), 100)
+        self.assertEqual(sorted(seen), sorted(Task.objects.values_list('id', flat=True)))
+
+    def test_skips_tasks_of_projects_pending_deletion(self):
+        Task.objects.create(project=self.project, title='Going')
+        self.project.deleted_at = timezone.now()
+        self.project.save()
+        self.assertEqual(self.sync()['changed'], [])
+
+    def test_moving_a_project_tombstones_its_tasks(self):
+        task = Task.objects.create(project=self.project, title='Moving')
+        cursor = self.sync()['cursor']
+        second = self.make_workspace(self.user, 'Second')
+        cache.clear()  # the membership above bypassed the API
+        response = self.client.patch(f'/api/projects/{self.project.id}/', {'workspace': second.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sync(cursor)['deleted'], [task.id])
+
+    def test_rejects_foreign_workspaces_and_bad_cursors(self):
+        foreign = self.make_workspace(self.other, 'Other')
+        response = self.client.get('/api/tasks/changes/', {'workspace': foreign.id})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/api/tasks/changes/', {'workspace': self.workspace.id, 'since': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RealtimeTests(WorkspaceAPITestCase):
+    def event(self, action, task_id, **data):
+        return {'model': 'task', 'action': action, 'id': task_id, 'workspace': self.workspace.id, 'data': data}
+
+    async def test_broker_coalesces_events_per_tick(self):
+        broker = LocalBroker(tick=0)
+        subscription = await broker.subscribe([self.workspace.id])
+        broker.publish(self.workspace.id, self.event('created', 1, title='a'))
+        broker.publish(self.workspace.id, self.event('updated', 1, title='b'))
+        broker.publish(self.workspace.id, self.event('updated', 2, title='c'))
+        broker.publish(self.workspace.id + 1, self.event('updated', 3))
+        events = await subscription.queue.get()
+        self.assertEqual([(e['id'], e['action'], e['data']['title']) for e in events], [(1, 'created', 'b'), (2, 'updated', 'c')])
+        broker.unsubscribe(subscription)
+
+    async def test_websocket_streams_workspace_events(self):
+        broker = LocalBroker(tick=0)
+        token = str(RefreshToken.for_user(self.user).access_token)
+        scope = {'type': 'websocket', 'path': '/ws/tasks/', 'query_string': f'token={token}'.encode()}
+        with mock.patch('workspace.realtime.get_broker', return_value=broker):
+            socket = ApplicationCommunicator(websocket_application, scope)
+            await socket.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await socket.receive_output(5))['type'], 'websocket.accept')
+            broker.publish(self.workspace.id, self.event('deleted', 7))
+            message = await socket.receive_output(5)
+            self.assertEqual(json.loads(message['text'])['events'][0]['id'], 7)
+            await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await socket.wait(5)
+        self.assertEqual(broker._subscribers, {})
+
+    async def test_removed_members_stop_receiving_workspace_events(self):
+        def add_member():
+            kept = self.make_workspace(self.other, 'Kept')
+            return kept, WorkspaceMember.objects.create(workspace=self.workspace, user=self.other, role='member')
+
+        def remove_member():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.client.delete(f'/api/members/{member.id}/').status_code, 204)
+
+        kept, member = await sync_to_async(add_member)()
+        broker = LocalBroker(tick=0)
+        token = str(RefreshToken.for_user(self.other).access_token)
+        scope = {'type': 'websocket', 'path': '/ws/tasks/', 'query_string': f'token={token}'.encode()}
+        with mock.patch('workspace.realtime.get_broker', return_value=broker):
+            socket = ApplicationCommunicator(websocket_application, scope)
+            await socket.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await socket.receive_output(5))['type'], 'websocket.accept')
+            await sync_to_async(remove_member)()
+            message = await socket.receive_output(5)
+            self.assertEqual([(e['model'], e['id']) for e in json.loads(message['text'])['events']], [('member', self.other.id)])
+            broker.publish(self.workspace.id, self.event('updated', 7))
+            broker.publish(kept.id, {**self.event('updated', 8), 'workspace': kept.id})
+            message = await socket.receive_output(5)
+            self.assertEqual([e['id'] for e in json.loads(message['text'])['events']], [8])
+            self.assertNotIn(self.workspace.id, broker._subscribers)
+            await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await socket.wait(5)
+
+    async def test_websocket_rejects_missing_token(self):
+        socket = ApplicationCommunicator(websocket_application, {'type': 'websocket', 'path': '/ws/tasks/'})
+        await socket.send_input({'type': 'websocket.connect'})
+        message = await socket.receive_output(5)
+        self.assertEqual(message, {'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+
+    def test_writes_publish_after_commit(self):
+        broker = mock.Mock()
+        with mock.patch('workspace.realtime.get_broker', return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/tasks/', {'project': self.project.id, 'title': 'Live'}, format='json')
+            self.assertEqual(response.status_code, 201)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(f'/api/projects/{self.project.id}/')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(f'/api/workspaces/{self.workspace.id}/')
+        published = [(call.args[1]['model'], call.args[1]['action']) for call in broker.publish.call_args_list]
+        self.assertEqual(published, [('task', 'created'), ('project', 'deleted'), ('workspace', 'deleted')])
+        self.assertEqual({call.args[0] for call in broker.publish.call_args_list}, {self.workspace.id})
+
+    def test_broker_failures_do_not_fail_the_write(self):
+        broker = mock.Mock()
+        broker.publish.side_effect = ConnectionError('broker down')
+        with mock.patch('workspace.realtime.get_broker', return_value=broker), \
+                self.assertLogs('django', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/tasks/', {'project': self.project.id, 'title': 'Live'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(TaskActivity.objects.filter(task_id=Task.objects.get(title='Live').id, action='created').exists())
+
+
+class ValuesListTests(WorkspaceAPITestCase):
+    def assertMatchesSerializer(self, url, serializer_class, queryset):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        expected = serializer_class(queryset, many=True).data
+        self.assertEqual(json.loads(response.content)['results'], json.loads(JSONRenderer().render(expected)))
+
+    def test_list_payloads_match_model_serializers(self):
+        Task.objects.create(
+            project=self.project, title='Café \u2028 ✓', description='x', assigned_to=self.user,
+            due_date=timezone.localdate(), status='done',
+        )
+        Task.objects.create(project=self.project, title='Bare')
+        self.assertMatchesSerializer('/api/tasks/', TaskSerializer, Task.objects.order_by('-updated_at', '-id'))
+        self.assertMatchesSerializer('/api/projects/', ProjectSerializer, Project.objects.order_by('-updated_at', '-id'))
+        self.assertMatchesSerializer('/api/workspaces/', WorkspaceSerializer, Workspace.objects.order_by('id'))
+
+    def test_cursor_links_work_on_values_rows(self):
+        for i in range(3):
+            Task.objects.create(project=self.project, title=f'Task {i}')
+        first = self.client.get('/api/tasks/', {'page_size': 2}).data
+        second = self.client.get(first['next']).data
+        self.assertEqual(len(first['results']) + len(second['results']), 3)
+        self.assertIsNone(second['next'])
+
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {'when': timezone.now(), 'day': timezone.localdate(), 'text': 'a\u2028b é', 1: [None, 1.5]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class SparseFieldsTests(WorkspaceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(project=self.project, title='Card', description='long ' * 500, assigned_to=self.user)
+
+    def test_list_fields_shrink_payload_and_select(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/', {'fields': 'id,title,status,bogus'})
+        self.assertEqual(response.data['results'], [{'id': self.task.id, 'title': 'Card', 'status': 'todo'}])
+        sql = ' '.join(q['sql'] for q in queries)
+        self.assertNotIn('"workspace_task"."description"', sql)
+        self.assertNotIn('"auth_user"', sql)
+
+    def test_detail_fields_defer_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/tasks/{self.task.id}/', {'fields': 'id,assigned_to'})
+        self.assertEqual(response.data, {'id': self.task.id, 'assigned_to': {'id': self.user.id, 'username': 'owner', 'email': 'owner@example.com'}})
+        self.assertFalse(any('"workspace_task"."description"' in q['sql'] for q in queries))
+
+    def test_expand_nests_relations(self):
+        listed = self.client.get('/api/tasks/', {'expand': 'project,assigned_to', 'fields': 'id,project'}).data['results'][0]
+        detail = self.client.get(f'/api/tasks/{self.task.id}/').data
+        self.assertEqual(listed['project'], json.loads(json.dumps(detail['project'])))
+        self.assertEqual(listed['project']['workspace'], 'Main')
+
+        project = self.client.get('/api/projects/', {'expand': 'workspace'}).data['results'][0]
+        self.assertEqual(project['workspace']['created_by']['username'], 'owner')
+        self.assertEqual(project['workspace'], self.client.get(f'/api/workspaces/{self.workspace.id}/').data)
+
+    def test_member_fields(self):
+        response = self.client.get('/api/members/', {'fields': 'role'})
+        self.assertEqual(response.data['results'], [{'role': 'admin'}])
+
+
+class TaskExportTests(WorkspaceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        Task.objects.create(project=self.project, title='First, "quoted"', assigned_to=self.user, due_date=timezone.localdate())
+        Task.objects.create(project=self.project, title='Second\nline')
+        foreign = self.make_workspace(self.other, 'Other')
+        Task.objects.create(project=Project.objects.create(workspace=foreign, name='Theirs'), title='Hidden')
+
+    def export(self, **params):
+        response = self.client.get(f'/api/workspaces/{self.workspace.id}/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_export(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(body.decode().splitlines(keepends=True)))
+        self.assertEqual([row['title'] for row in rows], ['First, "quoted"', 'Second\nline'])
+        self.assertEqual(rows[0]['project'], 'Board')
+        self.assertEqual(rows[0]['assigned_to'], 'owner@example.com')
+        self.assertEqual(rows[1]['assigned_to'], '')
+
+    def test_gzipped_ndjson_export(self):
+        response, body = self.export(output='ndjson', compress='gzip')
+        self.assertIn('.ndjson.gz', response['Content-Disposition'])
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['First, "quoted"', 'Second\nline'])
+        self.assertEqual(rows[0]['due_date'], timezone.localdate().isoformat())
+
+    def test_rejects_unknown_output_and_non_members(self):
+        response = self.client.get(f'/api/workspaces/{self.workspace.id}/export/', {'output': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(self.other)
+        response = self.client.get(f'/api/workspaces/{self.workspace.id}/export/')
+        self.assertEqual(response.status_code, 404)
+
+
+class TaskExportASGITests(TransactionTestCase):
+    # The ASGI handler runs views on its own thread, which can't see the
+    # open transaction of a TestCase.
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', email='owner@example.com', password='pass')
+        self.workspace = Workspace.objects.create(name='Main', created_by=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='admin')
+        project = Project.objects.create(workspace=self.workspace, name='Board')
+        for title in ('First', 'Second', 'Third'):
+            Task.objects.create(project=project, title=title)
+
+    async def test_streams_chunks_under_asgi(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': f'/api/workspaces/{self.workspace.id}/export/',
+            'query_string': b'', 'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+        }
+        with mock.patch('workspace.export.EXPORT_CHUNK_SIZE', 1), warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            request = ApplicationCommunicator(application, scope)
+            await request.send_input({'type': 'http.request'})
+            self.assertEqual((await request.receive_output(5))['status'], 200)
+            bodies = []
+            while True:
+                message = await request.receive_output(5)
+                bodies.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+        # Django warns when it has to read a sync iterator whole first.
+        self.assertEqual([str(w.message) for w in caught if 'iterator' in str(w.message)], [])
+        self.assertGreater(len(bodies), 2)
+        rows = list(csv.DictReader(b''.join(bodies).decode().splitlines(keepends=True)))
+        self.assertEqual([row['title'] for row in rows], ['First', 'Second', 'Third'])
+
+
+class TaskImportTests(WorkspaceAPITestCase):
+    def upload(self, name, content, **data):
+        return self.client.post(
+            f'/api/workspaces/{self.workspace.id}/import/',
+            {'file': SimpleUploadedFile(name, content if isinstance(content, bytes) else content.encode()), **data},
+            format='multipart',
+        )
+
+    def test_csv_import_reports_row_errors(self):
+        foreign = Project.objects.create(workspace=self.make_workspace(self.other, 'Other'), name='Theirs')
+        content = (
+            'project,title,assigned_to,status,due_date\n'
+            'Board,One,owner@example.com,done,2030-01-02\n'
+            f'{self.project.id},Two,,,\n'
+            'Board,,,todo,\n'
+            f'{foreign.id},Three,,,\n'
+            'Board,Four,nobody@example.com,,\n'
+            'Board,Five,,later,13/01/2030\n'
+            'Board,Six,other@example.com,,\n'
+            f'Board,Seven,{self.other.id},,\n'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload('tasks.csv', content)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 6)
+        self.assertEqual({error['row']: set(error['errors']) for error in response.data['errors']}, {
+            4: {'title'}, 5: {'project'}, 6: {'assigned_to'}, 7: {'status', 'due_date'},
+            # Users outside the workspace are not assignable.
+            8: {'assigned_to'}, 9: {'assigned_to'},
+        })
+        selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(sum('FROM "workspace_project"' in sql for sql in selects), 1)
+        self.assertEqual(sum('FROM "account_customuser"' in sql for sql in selects), 1)
+        self.assertEqual(sum(q['sql'].startswith('INSERT INTO "workspace_task"') for q in queries), 1)
+
+        one = Task.objects.get(title='One')
+        self.assertEqual((one.assigned_to, one.status, str(one.due_date)), (self.user, 'done', '2030-01-02'))
+        self.assertEqual(Task.objects.get(title='Two').workspace, self.workspace)
+        self.assertEqual(self.client.get(f'/api/workspaces/{self.workspace.id}/stats/').data['total'], 2)
+
+    def test_ndjson_import_and_command(self):
+        response = self.upload('tasks.ndjson', '{"project": "Board", "title": "From JSON"}\n[1]\n')
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 1))
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.upload('tasks.csv', 'project,title\nBoard,x\n').status_code, 404)
+
+    def test_undecodable_and_oversized_rows_are_row_errors(self):
+        content = b''.join([
+            '\ufeffproject,title\n'.encode(),
+            b'Board,One\n',
+            b'Board,Bad \xff byte\n',
+            b'Board,"' + b'x' * (csv.field_size_limit() + 1) + b'"\n',
+            'Board,Tw\u00f6\n'.encode(),
+        ])
+        response = self.upload('tasks.csv', content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 2))
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4])
+        self.assertEqual(set(Task.objects.values_list('title', flat=True)), {'One', 'Tw\u00f6'})
+
+        response = self.upload('tasks.ndjson', b'{"project": "Board", "title": "\xff"}\n{"project": "Board", "title": "Ok"}\n')
+        self.assertEqual((response.data['created'], response.data['errors']), (1, [
+            {'row': 1, 'errors': {'non_field_errors': ['Row is not valid UTF-8.']}},
+        ]))
+
+    def test_export_round_trips_through_command(self):
+        Task.objects.create(project=self.project, title='Exported', assigned_to=self.user, status='in_review')
+        body = b''.join(self.client.get(f'/api/workspaces/{self.workspace.id}/export/').streaming_content)
+        target = self.make_workspace(self.user, 'Target')
+        Project.objects.create(workspace=target, name='Board')
+        with tempfile.NamedTemporaryFile(suffix='.csv') as export:
+            export.write(body)
+            export.flush()
+            call_command('import_tasks', target.id, export.name, stdout=StringIO())
+        imported = Task.objects.get(workspace=target)
+        self.assertEqual((imported.title, imported.assigned_to, imported.status), ('Exported', self.user, 'in_review'))
+
+
+class ArrayCreateTests(WorkspaceAPITestCase):
+    def test_creates_tasks_in_order_with_batched_lookups(self):
+        second = Project.objects.create(workspace=self.workspace, name='Second')
+        payload = [
+            {'project': self.project.id, 'title': f'Task {i}', 'assigned_to': self.user.id if i % 2 else None}
+            for i in range(20)
+        ] + [{'project': second.id, 'title': 'Other board', 'status': 'done'}]
+        self.client.get(f'/api/workspaces/{self.workspace.id}/')  # warm the role cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/tasks/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([task['title'] for task in response.data], [item['title'] for item in payload])
+        self.assertEqual(response.data[1]['assigned_to']['id'], self.user.id)
+        self.assertEqual(response.data[-1]['project'], 'Second')
+
+        selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT')]
+        lookups = [sql for sql in selects if 'FROM "workspace_task"' not in sql and 'changesequence' not in sql]
+        self.assertEqual(len(lookups), 2)  # one IN query each for projects and users
+        self.assertEqual(sum('FROM "workspace_task"' in sql for sql in selects), 2)  # the end rank of each column
+        self.assertEqual(sum(q['sql'].startswith('INSERT INTO "workspace_task"') for q in queries), 1)
+        self.assertEqual(Task.objects.filter(workspace=self.workspace).count(), 21)
+        self.assertEqual(self.client.get(f'/api/projects/{second.id}/stats/').data['by_status']['done'], 1)
+
+    def test_invalid_items_reject_the_whole_array(self):
+        foreign = Project.objects.create(workspace=self.make_workspace(self.other, 'Other'), name='Theirs')
+        payload = [
+            {'project': self.project.id, 'title': 'Fine'},
+            {'project': 999999, 'title': 'Missing project'},
+            {'project': foreign.id, 'title': 'Not a member'},
+            {'project': self.project.id, 'title': 'Bad user', 'assigned_to': 'x'},
+        ]
+        response = self.client.post('/api/tasks/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual([set(errors) for errors in response.data[1:]], [{'project'}, {'project'}, {'assigned_to'}])
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(self.client.post('/api/tasks/', [], format='json').status_code, 400)
+
+    def test_creates_projects(self):
+        response = self.client.post('/api/projects/', [
+            {'workspace': self.workspace.id, 'name': 'Alpha'},
+            {'workspace': self.workspace.id, 'name': 'Beta'},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([(p['name'], p['workspace']) for p in response.data], [('Alpha', 'Main'), ('Beta', 'Main')])
+
+    def test_single_object_create_still_works(self):
+        response = self.client.post('/api/tasks/', {'project': self.project.id, 'title': 'Solo'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['title'], 'Solo')
+
+
+class TaskRankTests(WorkspaceAPITestCase):
+    def column(self, status='todo'):
+        return list(Task.objects.filter(project=self.project, status=status).order_by('rank', 'id').values_list('title', flat=True))
+
+    def test_rank_between(self):
+        self.assertEqual(rank_between(None, None), 'i')
+        for low, high in [('a', 'b'), ('a', 'a1'), ('az', 'b'), ('0001', '001'), (None, '01'), ('zz', None)]:
+            rank = rank_between(low, high)
+            self.assertTrue(is_valid_rank(rank), rank)
+            self.assertTrue((low or '') < rank and (high is None or rank < high), (low, high, rank))
+        ranks = spaced_ranks(1000)
+        self.assertEqual(ranks, sorted(set(ranks)))
+        self.assertTrue(all(is_valid_rank(rank) and len(rank) <= 2 for rank in ranks))
+        with self.assertRaises(ValueError):
+            rank_between('b', 'a')
+
+    def test_appends_and_prepends_stay_short(self):
+        tasks = [Task(project=self.project, workspace=self.workspace, title=str(i)) for i in range(1000)]
+        Task.assign_ranks(tasks)
+        Task.objects.bulk_create(tasks)
+        ranks = list(Task.objects.order_by('id').values_list('rank', flat=True))
+        self.assertEqual(ranks, sorted(set(ranks)))
+        self.assertTrue(all(is_valid_rank(rank) and len(rank) <= RANK_MAX_LENGTH for rank in ranks))
+        first = ranks[0]
+        for _ in range(1000):
+            previous, first = first, rank_between(None, first)
+            self.assertTrue(is_valid_rank(first) and first < previous)
+        self.assertLessEqual(max(len(rank) for rank in ranks + [first]), 6)
+
+    def test_new_tasks_append_to_their_column(self):
+        for title in ('a', 'b', 'c'):
+            self.client.post('/api/tasks/', {'project': self.project.id, 'title': title}, format='json')
+        self.client.post('/api/tasks/', [{'project': self.project.id, 'title': 'd'}], format='json')
+        self.assertEqual(self.column(), ['a', 'b', 'c', 'd'])
+        response = self.client.get('/api/tasks/', {'project': self.project.id, 'status': 'todo', 'ordering': 'rank'})
+        self.assertEqual([task['title'] for task in response.data['results']], ['a', 'b', 'c', 'd'])
+
+    def test_move_writes_one_row(self):
+        a, b, c = (Task.objects.create(project=self.project, title=title) for title in 'abc')
+        self.client.get(f'/api/tasks/{c.id}/')  # warm the role cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/tasks/{c.id}/move/', {'after': a.id, 'before': b.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.column(), ['a', 'c', 'b'])
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))]
+        # The row itself, then the change sequence and its stamp on the row.
+        self.assertEqual([sql.split()[1] for sql in writes], ['"workspace_task"', '"workspace_changesequence"', '"workspace_task"'])
+
+        self.client.post(f'/api/tasks/{a.id}/move/', {'status': 'done'}, format='json')
+        self.assertEqual(self.column('done'), ['a'])
+        self.assertEqual(self.client.get(f'/api/projects/{self.project.id}/stats/').data['by_status']['done'], 1)
+
+        for payload in ({'after': b.id, 'before': c.id}, {'after': a.id}, {'before': 999999}):
+            response = self.client.post(f'/api/tasks/{c.id}/move/', payload, format='json')
+            self.assertEqual(response.status_code, 400, payload)
+
+    def test_repeated_moves_trigger_rebalance(self):
+        a, b = Task.objects.create(project=self.project, title='a'), Task.objects.create(project=self.project, title='b')
+        moving = Task.objects.create(project=self.project, title='m')
+        with mock.patch('workspace.rebalance.REBALANCE_RANK_LENGTH', 4), \
+                mock.patch('workspace.rebalance.schedule_rebalance') as schedule:
+            for _ in range(30):
+                self.client.post(f'/api/tasks/{moving.id}/move/', {'after': a.id, 'before': b.id}, format='json')
+                a, moving = moving, a
+            schedule.assert_called_with(self.project.id, 'todo')
+            order = self.column()
+            self.assertTrue(rebalance_long_ranks())
+        self.assertEqual(self.column(), order)
+        self.assertTrue(all(len(rank) == 1 for rank in Task.objects.values_list('rank', flat=True)))
+
+    def test_status_changes_go_to_the_end_of_the_new_column(self):
+        a, b = (Task.objects.create(project=self.project, title=title, status='done') for title in 'ab')
+        c, d, e = (Task.objects.create(project=self.project, title=title) for title in 'cde')
+        self.client.patch(f'/api/tasks/{c.id}/', {'status': 'done'}, format='json')
+        self.assertEqual(self.column('done'), ['a', 'b', 'c'])
+
+        self.client.post('/api/tasks/bulk-update/', {'updates': [
+            {'id': e.id, 'status': 'done'}, {'id': d.id, 'status': 'done'},
+        ]}, format='json')
+        self.assertEqual(self.column('done'), ['a', 'b', 'c', 'e', 'd'])
+        ranks = list(Task.objects.filter(status='done').values_list('rank', flat=True))
+        self.assertEqual(len(set(ranks)), 5)
+
+    def test_move_without_neighbours_appends(self):
+        Task.objects.create(project=self.project, title='a', status='done')
+        b = Task.objects.create(project=self.project, title='b')
+        c = Task.objects.create(project=self.project, title='c')
+        self.client.post(f'/api/tasks/{b.id}/move/', {'status': 'done'}, format='json')
+        self.client.post(f'/api/tasks/{c.id}/move/', {'status': 'done'}, format='json')
+        self.assertEqual(self.column('done'), ['a', 'b', 'c'])
+        self.assertEqual(len(set(Task.objects.values_list('rank', flat=True))), 3)
+
+    def test_moves_never_store_ranks_past_the_limit(self):
+        a, b = Task.objects.create(project=self.project, title='a'), Task.objects.create(project=self.project, title='b')
+        moving = Task.objects.create(project=self.project, title='m')
+        # No worker runs the scheduled rebalances here.
+        with mock.patch('workspace.views.RANK_MAX_LENGTH', 6), mock.patch('workspace.rebalance.schedule_rebalance'):
+            for _ in range(60):
+                response = self.client.post(f'/api/tasks/{moving.id}/move/', {'after': a.id, 'before': b.id}, format='json')
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(response.data['rank']), 6)
+                a, moving = moving, a
+        self.assertEqual(len(self.column()), 3)
+        self.assertTrue(all(len(rank) <= 6 for rank in Task.objects.values_list('rank', flat=True)))
+
+    def test_bulk_update_accepts_rank(self):
+        task = Task.objects.create(project=self.project, title='a')
+        response = self.client.post('/api/tasks/bulk-update/', {'updates': [{'id': task.id, 'rank': 'b0'}]}, format='json')
+        self.assertEqual(response.data['results'][0]['updated'], False)
+        self.client.post('/api/tasks/bulk-update/', {'updates': [{'id': task.id, 'rank': 'b5'}]}, format='json')
+        task.refresh_from_db()
+        self.assertEqual(task.rank, 'b5')
+
+
+class DueDateTests(WorkspaceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.late = Task.objects.create(project=self.project, title='Late', due_date=self.today - timedelta(days=2))
+        self.closed = Task.objects.create(project=self.project, title='Closed', status='done', due_date=self.today - timedelta(days=2))
+        self.soon = Task.objects.create(project=self.project, title='Soon', due_date=self.today + timedelta(days=3))
+        Task.objects.create(project=self.project, title='Undated')
+
+    def titles(self, **params):
+        response = self.client.get('/api/tasks/', params)
+        self.assertEqual(response.status_code, 200)
+        return {task['title'] for task in response.data['results']}
+
+    def test_range_and_overdue_filters(self):
+        self.assertEqual(self.titles(due_after=self.today.isoformat()), {'Soon'})
+        self.assertEqual(self.titles(due_before=self.today.isoformat()), {'Late', 'Closed'})
+        self.assertEqual(self.titles(due_after=self.soon.due_date.isoformat(), due_before=self.soon.due_date.isoformat()), {'Soon'})
+        self.assertEqual(self.titles(overdue='true'), {'Late'})
+        self.assertEqual(self.client.get('/api/tasks/', {'due_after': '01/02/2025'}).status_code, 400)
+
+    def test_calendar_groups_by_day_in_one_query(self):
+        for i in range(3):
+            Task.objects.create(project=self.project, title=f'Soon {i}', due_date=self.soon.due_date)
+        self.client.get(f'/api/workspaces/{self.workspace.id}/')  # warm the role cache
+        params = {
+            'workspace': self.workspace.id, 'per_day': 2, 'fields': 'id,title',
+            'from': (self.today - timedelta(days=30)).isoformat(), 'to': (self.today + timedelta(days=30)).isoformat(),
+        }
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/calendar/', params)
+        days = response.data['days']
+        self.assertEqual([(day['date'], day['count'], len(day['tasks'])) for day in days], [
+            (self.late.due_date, 2, 2), (self.soon.due_date, 4, 2),
+        ])
+        self.assertEqual(days[1]['tasks'][0], {'id': self.soon.id, 'title': 'Soon'})
+
+    def test_calendar_validates_params(self):
+        foreign = self.make_workspace(self.other, 'Other')
+        url = '/api/tasks/calendar/'
+        self.assertEqual(self.client.get(url, {'workspace': foreign.id, 'from': '2025-01-01', 'to': '2025-01-31'}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'workspace': self.workspace.id, 'from': '2025-01-31', 'to': '2025-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'workspace': self.workspace.id, 'from': '2025-01-01', 'to': '2027-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'workspace': self.workspace.id}).status_code, 400)
+
+
+class TaskAdminTests(WorkspaceAPITestCase):
+    def test_admin_writes_keep_derived_data_in_step(self):
+        model_admin = admin.site.get_model_admin(Task)
+        request = RequestFactory().post('/admin/')
+        request.user = self.user
+        stats_url = f'/api/workspaces/{self.workspace.id}/stats/'
+
+        task = Task(project=self.project, title='From admin')
+        model_admin.save_model(request, task, None, False)
+        task.status = 'done'
+        model_admin.save_model(request, task, None, True)
+        stats = self.client.get(stats_url).data
+        self.assertEqual((stats['total'], stats['by_status']['done']), (1, 1))
+
+        other = Task.objects.create(project=self.project, title='Other')
+        rebuild_counters()
+        deleted_ids = {task.id, other.id}
+        model_admin.delete_model(request, task)
+        self.assertEqual(self.client.get(stats_url).data['total'], 1)
+        model_admin.delete_queryset(request, Task.objects.filter(pk=other.pk))
+        self.assertEqual(self.client.get(stats_url).data['total'], 0)
+        self.assertEqual(set(TaskDeletion.objects.values_list('task_id', flat=True)), deleted_ids)
+
+
+class TaskActivityTests(WorkspaceAPITestCase):
+    def test_one_insert_per_transaction(self):
+        tasks = [Task.objects.create(project=self.project, title=f'Task {i}') for i in range(5)]
+        updates = [{'id': task.id, 'status': 'done'} for task in tasks]
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/tasks/bulk-update/', {'updates': updates}, format='json')
+        self.assertEqual(response.status_code, 200)
+        inserts = [q['sql'] for q in queries if q['sql'].startswith('INSERT INTO "workspace_taskactivity"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(TaskActivity.objects.filter(action='updated').count(), 5)
+        entry = TaskActivity.objects.get(task_id=tasks[0].id)
+        self.assertEqual(entry.actor, self.user)
+        self.assertEqual(entry.changes, {'status': ['todo', 'done']})
+
+    def test_rolled_back_writes_are_not_logged(self):
+        task = Task.objects.create(project=self.project, title='Task')
+        before = task_snapshot(task)
+        task.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    log_task_activity([activity_entry('updated', before, task_snapshot(task))])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            task.title = 'Kept'
+            log_task_activity([activity_entry('updated', before, task_snapshot(task))])
+        self.assertEqual(list(TaskActivity.objects.values_list('changes', flat=True)), [{'title': ['Task', 'Kept']}])
+
+    def test_rolled_back_savepoints_drop_their_entries(self):
+        task = Task.objects.create(project=self.project, title='Task')
+        before = task_snapshot(task)
+
+        def log(title):
+            task.title = title
+            log_task_activity([activity_entry('updated', before, task_snapshot(task))])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                log('First')
+                try:
+                    with transaction.atomic():
+                        log('Rolled back')
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                with transaction.atomic():
+                    log('Released')
+                log('Last')
+        titles = [changes['title'][1] for changes in TaskActivity.objects.order_by('id').values_list('changes', flat=True)]
+        self.assertEqual(sorted(titles), ['First', 'Last', 'Released'])
+
+    def test_create_update_delete_diffs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/tasks/', {'project': self.project.id, 'title': 'New'}, format='json')
+        task_id = Task.objects.get(title='New').id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/tasks/{task_id}/', {'title': 'Renamed', 'assigned_to': self.user.id}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/tasks/{task_id}/', {'title': 'Renamed'}, format='json')
+
+        response = self.client.get(f'/api/tasks/{task_id}/activity/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(entry['action'], entry['changes']) for entry in response.data['results']], [
+            ('updated', {'title': ['New', 'Renamed'], 'assigned_to': [None, self.user.id]}),
+            ('created', {'project': [None, self.project.id], 'title': [None, 'New'], 'status': [None, 'todo']}),
+        ])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/tasks/{task_id}/')
+        latest = self.client.get(f'/api/workspaces/{self.workspace.id}/activity/').data['results'][0]
+        self.assertEqual(latest['action'], 'deleted')
+        self.assertEqual(latest['actor']['id'], self.user.id)
+        self.assertEqual(latest['changes']['title'], ['Renamed', None])
+
+    def test_endpoints_paginate_and_scope(self):
+        tasks = [Task.objects.create(project=self.project, title=f'Task {i}') for i in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/tasks/bulk-update/', {'updates': [{'id': task.id, 'status': 'done'} for task in tasks]}, format='json')
+
+        url = f'/api/workspaces/{self.workspace.id}/activity/'
+        first = self.client.get(url, {'page_size': 2}).data
+        second = self.client.get(first['next']).data
+        self.assertEqual(len(first['results']), 2)
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+
+        foreign = self.make_workspace(self.other, 'Other')
+        foreign_task = Task.objects.create(project=Project.objects.create(workspace=foreign, name='Theirs'), title='Theirs')
+        self.assertEqual(self.client.get(f'/api/workspaces/{foreign.id}/activity/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/tasks/{foreign_task.id}/activity/').status_code, 404)
+
+
+class BackgroundDeleteTests(WorkspaceAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = [Task.objects.create(project=self.project, title=f'Task {i}') for i in range(5)]
+        rebuild_counters()
+
+    def test_workspace_delete_hides_at_once_and_purges_later(self):
+        response = self.client.delete(f'/api/workspaces/{self.workspace.id}/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.get(f'/api/workspaces/{self.workspace.id}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/tasks/').data['results'], [])
+        self.assertEqual(self.client.get('/api/projects/').data['results'], [])
+        self.client.force_authenticate(self.other)
+        response = self.client.post('/api/workspaces/join/', {'invite_link': self.workspace.invite_link}, format='json')
+        self.assertNotEqual(response.status_code, 200)
+        self.assertTrue(Task.objects.exists())
+
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertFalse(Workspace.objects.filter(id=self.workspace.id).exists())
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_project_delete_purges_tasks_in_chunks(self):
+        response = self.client.delete(f'/api/projects/{self.project.id}/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.get('/api/tasks/').data['results'], [])
+        self.assertEqual(self.client.get(f'/api/tasks/{self.tasks[0].id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/workspaces/{self.workspace.id}/stats/').data['total'], 0)
+        response = self.client.post('/api/tasks/', {'project': self.project.id, 'title': 'Late'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        with mock.patch('workspace.purge.PURGE_CHUNK_SIZE', 2), CaptureQueriesContext(connection) as queries:
+            run_pending_jobs()
+        task_deletes = [q for q in queries if q['sql'].startswith('DELETE FROM "workspace_task" WHERE "workspace_task"."id" IN')]
+        self.assertEqual(len(task_deletes), 3)
+        self.assertFalse(Project.objects.filter(id=self.project.id).exists())
+        self.assertEqual(
+            set(TaskDeletion.objects.values_list('task_id', flat=True)), {task.id for task in self.tasks},
+        )
+
+    def test_failed_jobs_are_retried_then_kept(self):
+        enqueue('purge_project', project_id=self.project.id)
+        with mock.patch('workspace.purge.purge_project', side_effect=RuntimeError('boom')), \
+                self.assertLogs('workspace.jobs', 'ERROR'):
+            for attempt in range(1, JOB_MAX_ATTEMPTS + 1):
+                Job.objects.update(run_after=timezone.now())
+                job = claim_job()
+                self.assertEqual(job.attempts, attempt)
+                self.assertFalse(run_job(job))
+        job = Job.objects.get()
+        self.assertEqual(job.state, Job.FAILED)
+        self.assertIn('boom', job.last_error)
+        self.assertIsNone(claim_job())
+
+    def test_expired_leases_are_reclaimed(self):
+        job = enqueue('purge_project', project_id=self.project.id)
+        self.assertEqual(claim_job().id, job.id)
+        self.assertIsNone(claim_job())
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_job().id, job.id)
+
+    def test_rebalance_is_queued_once_per_column(self):
+        schedule_rebalance(self.project.id, 'todo')
+        schedule_rebalance(self.project.id, 'todo')
+        schedule_rebalance(self.project.id, 'done')
+        self.assertEqual(Job.objects.filter(name='rebalance_column').count(), 2)
+        self.assertEqual(run_pending_jobs(), 2)
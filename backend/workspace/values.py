@@ -0,0 +1,164 @@
+"""
+Serializers that render list pages straight from ``QuerySet.values()``.
+
+Building a model instance and walking a ``ModelSerializer`` field tree for
+every row is most of the CPU cost of a list request. A ``ValuesSerializer``
+declares the same output shape as a set of ``values()`` paths with cheap
+per-field conversions, so a page is one SELECT of just those columns (the
+joins follow from the paths) and a loop building plain dicts.
+
+Each ``ValuesSerializer`` in ``serializers.py`` mirrors a DRF serializer
+and must produce identical output; keep the two in step. Conversions
+assume DRF's default ISO 8601 date and datetime formats.
+"""
+import copy
+import operator
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .sparse import EXPAND_PARAM, FIELDS_PARAM, parse_names
+
+
+class Field:
+    """One output value read from one ``values()`` path."""
+
+    def __init__(self, path, convert=None):
+        self.path = path
+        self.convert = convert
+
+    @property
+    def paths(self):
+        return (self.path,)
+
+    def prefixed(self, prefix):
+        field = copy.copy(self)
+        field.path = f'{prefix}__{self.path}'
+        return field
+
+    def getter(self):
+        path, convert = self.path, self.convert
+        if convert is None:
+            return operator.itemgetter(path)
+
+        def get(row):
+            value = row[path]
+            return None if value is None else convert(value)
+        return get
+
+
+class DateField(Field):
+    def __init__(self, path):
+        super().__init__(path, convert=lambda value: value.isoformat())
+
+
+class DateTimeField(Field):
+    """Matches ``serializers.DateTimeField``: current time zone, ``Z`` for UTC."""
+
+    def getter(self):
+        path = self.path
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+        def get(row):
+            value = row[path]
+            if value is None:
+                return None
+            if tz is not None:
+                value = value.astimezone(tz)
+            value = value.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return get
+
+
+class Nested:
+    """A nested object, or ``None`` when the foreign key at ``key`` is null."""
+
+    def __init__(self, key, fields):
+        self.key = key
+        self.fields = fields
+
+    @property
+    def paths(self):
+        return (self.key, *(path for field in self.fields.values() for path in field.paths))
+
+    def prefixed(self, prefix):
+        return Nested(
+            f'{prefix}__{self.key}',
+            {name: field.prefixed(prefix) for name, field in self.fields.items()},
+        )
+
+    def getter(self):
+        key = self.key
+        getters = [(name, field.getter()) for name, field in self.fields.items()]
+
+        def get(row):
+            if row[key] is None:
+                return None
+            return {name: get_value(row) for name, get_value in getters}
+        return get
+
+
+class ValuesSerializer:
+    """
+    Declares ``fields`` as ``{output name: Field or Nested}`` in output
+    order, and ``expansions`` as the replacements used for names passed in
+    ``expand``. ``fields`` restricts the output to the given names.
+    ``serialize()`` turns ``values(*paths)`` rows into dicts.
+    """
+    fields = {}
+    expansions = {}
+
+    def __init__(self, fields=None, expand=()):
+        self._fields = {
+            name: self.expansions[name] if name in expand and name in self.expansions else field
+            for name, field in self.fields.items()
+            if fields is None or name in fields
+        }
+
+    @classmethod
+    def nested(cls, key):
+        """This serializer's default shape nested under foreign key ``key``."""
+        return Nested(key, {name: field.prefixed(key) for name, field in cls.fields.items()})
+
+    @property
+    def paths(self):
+        return list(dict.fromkeys(path for field in self._fields.values() for path in field.paths))
+
+    def serialize(self, rows):
+        getters = [(name, field.getter()) for name, field in self._fields.items()]
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+
+class ValuesListMixin:
+    """
+    Serves ``list`` through ``values_serializer_class`` when the view sets
+    one. The page's cursor ordering fields are fetched alongside the
+    serializer's paths so the paginator can build its links from the rows.
+    """
+    values_serializer_class = None
+
+    def get_values_serializer(self):
+        if self.values_serializer_class is None:
+            return None
+        return self.values_serializer_class(
+            fields=parse_names(self.request, FIELDS_PARAM),
+            expand=parse_names(self.request, EXPAND_PARAM) or (),
+        )
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_values_serializer()
+        if serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        paths = serializer.paths
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, 'get_ordering'):
+            paths += [name.lstrip('-') for name in paginator.get_ordering(self)]
+        rows = queryset.values(*dict.fromkeys(paths))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
@@ -1,19 +1,69 @@
-from rest_framework import viewsets, permissions, status
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import Workspace, Project, Task, WorkspaceMember
+from .activity import ActivityPagination
+from .bulk import BulkCreateMixin
+from .changes import (
+    record_member_removed, record_project_change, record_project_move, record_task_changes,
+    record_workspace_deleted, task_snapshot,
+)
+from .conditional import ConditionalGetMixin
+from .counters import get_task_stats
+from .due_dates import (
+    CALENDAR_MAX_DAYS, CALENDAR_MAX_TASKS_PER_DAY, CALENDAR_TASKS_PER_DAY,
+    overdue_q, parse_date_param, task_calendar,
+)
+from .export import EXPORT_FORMATS, aiter_export, stream_task_export
+from .imports import IMPORT_FORMATS, import_tasks
+from .jobs import enqueue
+from .models import Workspace, Project, Task, TaskActivity, TaskCounter, WorkspaceMember
 from .serializers import (
     WorkspaceSerializer, WorkspaceCreateSerializer,
     ProjectSerializer, ProjectCreateSerializer,
     TaskSerializer, TaskCreateSerializer, TaskDetailSerializer,
-    WorkspaceMemberSerializer
+    WorkspaceMemberSerializer, TaskBulkUpdateItemSerializer,
+    WorkspaceValuesSerializer, ProjectValuesSerializer, TaskValuesSerializer,
+    TaskMoveSerializer, TaskActivitySerializer,
 )
+from .ranks import RANK_MAX_LENGTH, rank_between
+from .rebalance import rebalance_column, rebalance_if_needed
+from .permissions import IsWorkspaceMember, get_workspace_roles, invalidate_workspace_roles
+from .search import search_tasks
+from .sparse import SparseFieldsViewMixin
+from .sync import InvalidCursor, get_task_changes
 from .utils import generate_invite_token
+from .values import ValuesListMixin
+
+User = get_user_model()
+
+# Upper bound on the number of tasks a single bulk-update request may touch.
+BULK_UPDATE_LIMIT = 500
+
+# Default and maximum number of rows per delta sync response.
+SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 2000
+
+
+def activity_response(view, queryset):
+    """One keyset page of ``queryset``'s activity, newest first."""
+    paginator = ActivityPagination()
+    page = paginator.paginate_queryset(queryset.select_related('actor'), view.request, view=view)
+    return paginator.get_paginated_response(TaskActivitySerializer(page, many=True).data)
 
 
 # ------------------ Workspace ------------------
-class WorkspaceViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class WorkspaceViewSet(ConditionalGetMixin, SparseFieldsViewMixin, ValuesListMixin, viewsets.ModelViewSet):
+    permission_classes = [IsWorkspaceMember]
+    deferrable_fields = ('name', 'image_url', 'invite_link')
+    values_serializer_class = WorkspaceValuesSerializer
+    admin_actions = ['destroy']
+    cursor_ordering = ('id',)
+    etag_related = ('created_by__updated_at',)
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -21,9 +71,7 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
         return WorkspaceSerializer
 
     def get_queryset(self):
-        return Workspace.objects.filter(
-            memberships__user=self.request.user
-        ).distinct()
+        return Workspace.objects.for_user(self.request.user).select_related('created_by')
 
     def perform_create(self, serializer):
         workspace = serializer.save(created_by=self.request.user)
@@ -32,20 +80,23 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
         )
         workspace.invite_link = generate_invite_token()
         workspace.save()
+        invalidate_workspace_roles(self.request.user.pk)
 
     def destroy(self, request, *args, **kwargs):
-        workspace = self.get_object()
-        try:
-            membership = WorkspaceMember.objects.get(
-                workspace=workspace, user=request.user
-            )
-        except WorkspaceMember.DoesNotExist:
-            return Response({'error': 'Not a member of this workspace'}, status=403)
-
-        if membership.role != 'admin' and workspace.created_by != request.user:
-            return Response({'error': 'Only admin/creator can delete this workspace'}, status=403)
-
-        return super().destroy(request, *args, **kwargs)
+        self.perform_destroy(self.get_object())
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+    def perform_destroy(self, instance):
+        # Hide the workspace now and purge its contents in the background;
+        # dropping the memberships takes it out of every member's scope.
+        member_ids = list(instance.memberships.values_list('user_id', flat=True))
+        with transaction.atomic():
+            instance.deleted_at = timezone.now()
+            instance.save(update_fields=['deleted_at', 'updated_at'])
+            instance.memberships.all().delete()
+            record_workspace_deleted(instance)
+            enqueue('purge_workspace', workspace_id=instance.id)
+        invalidate_workspace_roles(*member_ids)
 
     @action(detail=False, methods=['post'], url_path='join')
     def join_workspace(self, request):
@@ -53,7 +104,7 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
         if not token:
             return Response({'error': 'Invite link required'}, status=400)
         try:
-            workspace = Workspace.objects.get(invite_link=token)
+            workspace = Workspace.objects.get(invite_link=token, deleted_at__isnull=True)
         except Workspace.DoesNotExist:
             return Response({'error': 'Invalid invite link'}, status=400)
 
@@ -65,6 +116,8 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
         if not created:
             return Response({'message': 'Already a member'}, status=200)
 
+        invalidate_workspace_roles(request.user.pk)
+
         return Response({'message': f'Joined {workspace.name} successfully!'}, status=201)
 
     @action(detail=True, methods=['post'], url_path='regenerate-invite')
@@ -76,16 +129,65 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
         workspace.save()
         return Response({'invite_link': workspace.invite_link})
 
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        workspace = self.get_object()
+        return Response(get_task_stats(workspace_id=workspace.id))
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        workspace = self.get_object()
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response({'error': f"output must be one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+        gzip = request.query_params.get('compress') == 'gzip'
+
+        chunks = stream_task_export(Task.objects.live().filter(workspace=workspace), output, gzip=gzip)
+        if isinstance(request._request, ASGIRequest):
+            chunks = aiter_export(chunks)
+        response = StreamingHttpResponse(
+            chunks,
+            content_type='application/gzip' if gzip else EXPORT_FORMATS[output],
+        )
+        filename = f"workspace-{workspace.id}-tasks.{output}{'.gz' if gzip else ''}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=True, methods=['post'], url_path='import')
+    def bulk_import(self, request, pk=None):
+        workspace = self.get_object()
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file is required'}, status=400)
+        input_format = request.data.get('input') or ('ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+        if input_format not in IMPORT_FORMATS:
+            return Response({'error': f"input must be one of: {', '.join(IMPORT_FORMATS)}"}, status=400)
+
+        result = import_tasks(workspace, upload.file, input_format, actor=request.user)
+        return Response({'created': result.created, 'failed': result.failed, 'errors': result.errors})
+
+    @action(detail=True, methods=['get'])
+    def activity(self, request, pk=None):
+        workspace = self.get_object()
+        return activity_response(self, TaskActivity.objects.filter(workspace=workspace))
+
 
 # ------------------ WorkspaceMember ------------------
-class WorkspaceMemberViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class WorkspaceMemberViewSet(ConditionalGetMixin, SparseFieldsViewMixin, viewsets.ModelViewSet):
+    permission_classes = [IsWorkspaceMember]
+    admin_actions = ['update', 'partial_update', 'destroy']
     serializer_class = WorkspaceMemberSerializer
+    cursor_ordering = ('id',)
+    etag_related = ('user__updated_at',)
 
     def get_queryset(self):
-        return WorkspaceMember.objects.filter(
-            workspace__memberships__user=self.request.user
-        )
+        queryset = WorkspaceMember.objects.for_user(self.request.user).select_related('user')
+
+        workspace_id = self.request.query_params.get('workspace')
+        if workspace_id:
+            queryset = queryset.filter(workspace_id=workspace_id)
+
+        return queryset
 
     def create(self, request, *args, **kwargs):
         return Response(
@@ -99,38 +201,30 @@ class WorkspaceMemberViewSet(viewsets.ModelViewSet):
         if not role:
             return Response({'error': 'Role is required'}, status=400)
 
-        try:
-            current_user_membership = WorkspaceMember.objects.get(
-                workspace=member.workspace, user=request.user
-            )
-            if current_user_membership.role != 'admin' and member.workspace.created_by != request.user:
-                return Response({'error': 'Only admin/creator can update member role'}, status=403)
-        except WorkspaceMember.DoesNotExist:
-            return Response({'error': 'You are not a member of this workspace'}, status=403)
-
         member.role = role
         member.save()
+        invalidate_workspace_roles(member.user_id)
         serializer = WorkspaceMemberSerializer(member)
         return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
         member = self.get_object()
-        try:
-            current_user_membership = WorkspaceMember.objects.get(
-                workspace=member.workspace, user=request.user
-            )
-            if current_user_membership.role != 'admin' and member.workspace.created_by != request.user:
-                return Response({'error': 'Only admin/creator can remove members'}, status=403)
-        except WorkspaceMember.DoesNotExist:
-            return Response({'error': 'You are not a member of this workspace'}, status=403)
-
-        member.delete()
+        with transaction.atomic():
+            member.delete()
+            record_member_removed(member)
+        invalidate_workspace_roles(member.user_id)
         return Response({'message': 'Member removed successfully'}, status=204)
 
 
 # ------------------ Project ------------------
-class ProjectViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class ProjectViewSet(ConditionalGetMixin, SparseFieldsViewMixin, ValuesListMixin, BulkCreateMixin, viewsets.ModelViewSet):
+    permission_classes = [IsWorkspaceMember]
+    bulk_response_serializer_class = ProjectSerializer
+    deferrable_fields = ('name', 'description', 'image_url', 'created_at')
+    values_serializer_class = ProjectValuesSerializer
+    cursor_ordering = ('-updated_at', '-id')
+    etag_related = ('workspace__updated_at',)
+    etag_expand_related = {'workspace': ('workspace__created_by__updated_at',)}
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -138,9 +232,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         return ProjectSerializer
 
     def get_queryset(self):
-        queryset = Project.objects.filter(
-            workspace__memberships__user=self.request.user
-        ).distinct()
+        queryset = Project.objects.for_user(self.request.user).select_related('workspace')
 
         workspace_id = self.request.query_params.get('workspace')
         if workspace_id:
@@ -148,10 +240,55 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            record_project_change('created', serializer.save())
+
+    def perform_bulk_create(self, serializer):
+        with transaction.atomic():
+            projects = serializer.save()
+            for project in projects:
+                record_project_change('created', project)
+        return projects
+
+    def perform_update(self, serializer):
+        previous_workspace_id = serializer.instance.workspace_id
+        with transaction.atomic():
+            project = serializer.save()
+            if project.workspace_id != previous_workspace_id:
+                record_project_move(project, previous_workspace_id)
+            else:
+                record_project_change('updated', project)
+
+    def destroy(self, request, *args, **kwargs):
+        self.perform_destroy(self.get_object())
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+    def perform_destroy(self, instance):
+        # Tasks are hidden via TaskQuerySet.live() until the purge job runs.
+        with transaction.atomic():
+            record_project_change('deleted', instance)
+            instance.deleted_at = timezone.now()
+            instance.save(update_fields=['deleted_at', 'updated_at'])
+            TaskCounter.objects.filter(project=instance).delete()
+            enqueue('purge_project', project_id=instance.id)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        project = self.get_object()
+        return Response(get_task_stats(project_id=project.id))
+
 
 # ------------------ Task ------------------
-class TaskViewSet(viewsets.ModelViewSet):
-    permission_classes = [permissions.IsAuthenticated]
+class TaskViewSet(ConditionalGetMixin, SparseFieldsViewMixin, ValuesListMixin, BulkCreateMixin, viewsets.ModelViewSet):
+    permission_classes = [IsWorkspaceMember]
+    bulk_response_serializer_class = TaskSerializer
+    deferrable_fields = ('title', 'description', 'status', 'due_date', 'created_at')
+    values_serializer_class = TaskValuesSerializer
+    cursor_ordering = ('-updated_at', '-id')
+    etag_related = ('project__updated_at', 'assigned_to__updated_at')
+    detail_etag_related = ('project__updated_at', 'project__workspace__updated_at', 'assigned_to__updated_at')
+    etag_expand_related = {'project': ('project__workspace__updated_at',)}
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -160,15 +297,26 @@ class TaskViewSet(viewsets.ModelViewSet):
             return TaskDetailSerializer
         return TaskSerializer
 
+    def get_cursor_ordering(self):
+        # Search results are listed best match first.
+        if self.request.query_params.get('search'):
+            return ('search_rank', 'id')
+        # Board order; filter by project and status to read one column.
+        if self.request.query_params.get('ordering') == 'rank':
+            return ('rank', 'id')
+        return self.cursor_ordering
+
     def get_queryset(self):
-        queryset = Task.objects.filter(
-            project__workspace__memberships__user=self.request.user
-        ).distinct()
+        queryset = Task.objects.for_user(self.request.user)
+        if self.action == 'retrieve':
+            queryset = queryset.select_related('project__workspace', 'assigned_to')
+        else:
+            queryset = queryset.select_related('project', 'assigned_to')
 
         # Filters
         workspace_id = self.request.query_params.get('workspace')
         if workspace_id:
-            queryset = queryset.filter(project__workspace_id=workspace_id)
+            queryset = queryset.filter(workspace_id=workspace_id)
 
         project_id = self.request.query_params.get('project')
         if project_id:
@@ -184,10 +332,233 @@ class TaskViewSet(viewsets.ModelViewSet):
 
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(title__icontains=search)
+            queryset = search_tasks(queryset, search)
 
         due_date = self.request.query_params.get('due_date')
         if due_date:
             queryset = queryset.filter(due_date=due_date)
 
+        # Inclusive bounds.
+        due_after = parse_date_param(self.request.query_params, 'due_after')
+        if due_after:
+            queryset = queryset.filter(due_date__gte=due_after)
+
+        due_before = parse_date_param(self.request.query_params, 'due_before')
+        if due_before:
+            queryset = queryset.filter(due_date__lte=due_before)
+
+        if self.request.query_params.get('overdue') == 'true':
+            queryset = queryset.filter(overdue_q())
+
         return queryset
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            task = serializer.save()
+            record_task_changes(created=[task], actor=self.request.user)
+            rebalance_if_needed([task])
+
+    def perform_bulk_create(self, serializer):
+        with transaction.atomic():
+            tasks = serializer.save()
+            record_task_changes(created=tasks, actor=self.request.user)
+            rebalance_if_needed(tasks)
+        return tasks
+
+    def perform_update(self, serializer):
+        before = task_snapshot(serializer.instance)
+        with transaction.atomic():
+            task = serializer.save()
+            record_task_changes(updated=[(before, task)], actor=self.request.user)
+            rebalance_if_needed([task])
+
+    def perform_destroy(self, instance):
+        snapshot = task_snapshot(instance)
+        with transaction.atomic():
+            instance.delete()
+            record_task_changes(deleted=[snapshot], actor=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def move(self, request, pk=None):
+        task = self.get_object()
+        move = TaskMoveSerializer(data=request.data)
+        if not move.is_valid():
+            return Response(move.errors, status=400)
+        status_value = move.validated_data.get('status', task.status)
+        after_id = move.validated_data.get('after')
+        before_id = move.validated_data.get('before')
+
+        try:
+            rank = self.move_rank(task, status_value, after_id, before_id)
+            if len(rank) > RANK_MAX_LENGTH:
+                # Too long to store: respace the column now rather than
+                # wait for the scheduled rebalance, then place it again.
+                rebalance_column(task.project_id, status_value)
+                rank = self.move_rank(task, status_value, after_id, before_id)
+        except LookupError:
+            return Response({'error': 'after and before must be other tasks in the target column'}, status=400)
+        except ValueError:
+            return Response({'error': 'after must come before before'}, status=400)
+
+        before = task_snapshot(task)
+        task.rank, task.status = rank, status_value
+        with transaction.atomic():
+            task.save(update_fields=['rank', 'status', 'updated_at'])
+            record_task_changes(updated=[(before, task)], actor=self.request.user)
+            rebalance_if_needed([task])
+        return Response(TaskSerializer(task, context=self.get_serializer_context()).data)
+
+    def move_rank(self, task, status_value, after_id, before_id):
+        """
+        A rank for ``task`` between the given neighbours of the target
+        column, or after its last task if neither is given.
+        """
+        neighbour_ids = {after_id, before_id} - {None}
+        if not neighbour_ids:
+            return rank_between(Task.last_rank(task.project_id, status_value, exclude=task.id), None)
+        # One query for both neighbours; they must sit in the target column.
+        neighbours = Task.objects.filter(
+            id__in=neighbour_ids, project_id=task.project_id, status=status_value
+        ).exclude(id=task.id).in_bulk(field_name='id')
+        if len(neighbours) != len(neighbour_ids):
+            raise LookupError(neighbour_ids - set(neighbours))
+        return rank_between(
+            neighbours[after_id].rank if after_id else None,
+            neighbours[before_id].rank if before_id else None,
+        )
+
+    @action(detail=True, methods=['get'])
+    def activity(self, request, pk=None):
+        task = self.get_object()
+        return activity_response(self, TaskActivity.objects.filter(task_id=task.id))
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        try:
+            workspace_id = int(request.query_params['workspace'])
+        except (KeyError, ValueError):
+            return Response({'error': 'workspace is required'}, status=400)
+        if workspace_id not in get_workspace_roles(request):
+            return Response({'error': 'Workspace not found'}, status=404)
+        start = parse_date_param(request.query_params, 'from')
+        end = parse_date_param(request.query_params, 'to')
+        if start is None or end is None:
+            return Response({'error': 'from and to are required'}, status=400)
+        if not 0 <= (end - start).days < CALENDAR_MAX_DAYS:
+            return Response({'error': f'from must not be after to, at most {CALENDAR_MAX_DAYS} days apart'}, status=400)
+        try:
+            per_day = int(request.query_params.get('per_day', CALENDAR_TASKS_PER_DAY))
+        except ValueError:
+            per_day = CALENDAR_TASKS_PER_DAY
+        per_day = max(1, min(per_day, CALENDAR_MAX_TASKS_PER_DAY))
+
+        queryset = self.filter_queryset(self.get_queryset())
+        days = task_calendar(queryset, start, end, self.get_values_serializer(), per_day=per_day)
+        return Response({'from': start, 'to': end, 'days': days})
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        try:
+            workspace_id = int(request.query_params['workspace'])
+        except (KeyError, ValueError):
+            return Response({'error': 'workspace is required'}, status=400)
+        if workspace_id not in get_workspace_roles(request):
+            return Response({'error': 'Workspace not found'}, status=404)
+
+        try:
+            limit = min(int(request.query_params.get('limit', SYNC_LIMIT)), MAX_SYNC_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=400)
+
+        try:
+            changes = get_task_changes(workspace_id, request.query_params.get('since'), max(limit, 1))
+        except InvalidCursor as exc:
+            return Response({'error': str(exc)}, status=400)
+
+        return Response({
+            'changed': TaskSerializer(changes.changed, many=True).data,
+            'deleted': changes.deleted,
+            'cursor': changes.cursor,
+            'has_more': changes.has_more,
+        })
+
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request):
+        updates = request.data.get('updates')
+        if not isinstance(updates, list) or not updates:
+            return Response({'error': 'updates must be a non-empty list'}, status=400)
+        if len(updates) > BULK_UPDATE_LIMIT:
+            return Response({'error': f'At most {BULK_UPDATE_LIMIT} updates per request'}, status=400)
+
+        # Validate every entry up front; invalid entries are reported, not applied.
+        results = []
+        changes = {}
+        for entry in updates:
+            item = TaskBulkUpdateItemSerializer(data=entry)
+            if not item.is_valid():
+                entry_id = entry.get('id') if isinstance(entry, dict) else None
+                results.append({'id': entry_id, 'updated': False, 'errors': item.errors})
+                continue
+            data = dict(item.validated_data)
+            task_id = data.pop('id')
+            changes.setdefault(task_id, {}).update(data)
+            results.append({'id': task_id, 'updated': True})
+
+        # One query each for the affected tasks and the assignees; roles
+        # come from the cached role map.
+        member_workspaces = get_workspace_roles(request)
+        tasks = Task.objects.live().in_bulk(list(changes))
+        assignee_ids = {
+            data['assigned_to'] for data in changes.values()
+            if data.get('assigned_to') is not None
+        }
+        existing_users = set(
+            User.objects.filter(id__in=assignee_ids).values_list('id', flat=True)
+        ) if assignee_ids else set()
+
+        errors = {}
+        for task_id, data in changes.items():
+            task = tasks.get(task_id)
+            if task is None or task.workspace_id not in member_workspaces:
+                errors[task_id] = {'id': ['Task not found.']}
+            elif data.get('assigned_to') is not None and data['assigned_to'] not in existing_users:
+                errors[task_id] = {'assigned_to': ['User not found.']}
+
+        now = timezone.now()
+        to_update = []
+        moved = []
+        snapshots = []
+        fields = {'updated_at'}
+        for task_id, data in changes.items():
+            if task_id in errors:
+                continue
+            task = tasks[task_id]
+            snapshots.append(task_snapshot(task))
+            for field, value in data.items():
+                if field == 'assigned_to':
+                    task.assigned_to_id = value
+                else:
+                    setattr(task, field, value)
+            task.updated_at = now
+            fields.update(data)
+            to_update.append(task)
+            if 'rank' not in data and task.left_column():
+                # Its rank belongs to the old column; go to the end of the new one.
+                task.rank = ''
+                moved.append(task)
+
+        if to_update:
+            with transaction.atomic():
+                if moved:
+                    Task.assign_ranks(moved)
+                    fields.add('rank')
+                Task.objects.bulk_update(to_update, sorted(fields))
+                record_task_changes(updated=zip(snapshots, to_update), actor=self.request.user)
+                rebalance_if_needed(moved)
+
+        for result in results:
+            if result['updated'] and result['id'] in errors:
+                result['updated'] = False
+                result['errors'] = errors[result['id']]
+
+        return Response({'results': results})
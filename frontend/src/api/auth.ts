@@ -17,8 +17,14 @@ export const authApi = {
     return response.data.data;
   },
 
-  socialLogin: async (data: { provider: string; token?: string; code?: string }) => {
-    const response = await axiosInstance.post<AuthResponse>('/api/auth/social/', data);
+  // Sets the nonce cookie that socialLogin sends back; both need credentials.
+  socialNonce: async () => {
+    const response = await axiosInstance.get<{ nonce: string }>('/api/auth/social/nonce/', { withCredentials: true });
+    return response.data.nonce;
+  },
+
+  socialLogin: async (data: { provider: string; token?: string; id_token?: string; code?: string }) => {
+    const response = await axiosInstance.post<AuthResponse>('/api/auth/social/', data, { withCredentials: true });
     return response.data;
   },
 
@@ -0,0 +1,15 @@
+import axiosInstance from './axios';
+
+export interface Page<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+// Fetches one page of a paginated list endpoint. Further pages are loaded
+// on demand by passing the previous page's `next` link, which already
+// carries the filters and the cursor.
+export const fetchPage = async <T>(url: string, params?: Record<string, unknown>) => {
+  const response = await axiosInstance.get<Page<T>>(url, { params });
+  return response.data;
+};
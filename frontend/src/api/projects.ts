@@ -1,12 +1,13 @@
 import axiosInstance from './axios';
+import { fetchPage } from './pagination';
 import type { Project } from '../types';
 
 export const projectApi = {
-  getAll: async (workspaceId?: number) => {
-    const response = await axiosInstance.get<Project[]>('/api/projects/', {
-      params: workspaceId ? { workspace: workspaceId } : undefined,
-    });
-    return response.data;
+  // One page of projects; pass the previous page's `next` link to load the one after it.
+  getPage: async (workspaceId?: number, next?: string | null) => {
+    return next
+      ? fetchPage<Project>(next)
+      : fetchPage<Project>('/api/projects/', workspaceId ? { workspace: workspaceId } : undefined);
   },
 
   getById: async (id: number) => {
@@ -1,12 +1,12 @@
 import axiosInstance from './axios';
+import { fetchPage } from './pagination';
 import type { Task } from '../types';
 
 export const taskApi = {
-  getAll: async (projectId?: number) => {
-    const response = await axiosInstance.get<Task[]>('/api/tasks/', {
-      params: projectId ? { project: projectId } : undefined,
-    });
-    return response.data;
+  // One page of a board column in rank order; pass the previous page's
+  // `next` link to load the one after it.
+  getPage: async (params: { project: number; status?: string }, next?: string | null) => {
+    return next ? fetchPage<Task>(next) : fetchPage<Task>('/api/tasks/', { ...params, ordering: 'rank' });
   },
 
   getById: async (id: number) => {
@@ -1,10 +1,10 @@
 import axiosInstance from './axios';
+import { fetchAllPages } from './pagination';
 import type { Workspace, WorkspaceMember } from '../types';
 
 export const workspaceApi = {
   getAll: async () => {
-    const response = await axiosInstance.get<Workspace[]>('/api/workspaces/');
-    return response.data;
+    return fetchAllPages<Workspace>('/api/workspaces/');
   },
 
   getById: async (id: number) => {
@@ -37,10 +37,7 @@ export const workspaceApi = {
   },
 
   getMembers: async (workspaceId: number) => {
-    const response = await axiosInstance.get<WorkspaceMember[]>('/api/members/', {
-      params: { workspace: workspaceId },
-    });
-    return response.data;
+    return fetchAllPages<WorkspaceMember>('/api/members/', { workspace: workspaceId });
   },
 
   updateMember: async (memberId: number, role: 'admin' | 'member') => {
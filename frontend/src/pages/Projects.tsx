@@ -7,6 +7,8 @@ import '../styles/Projects.css';
 const Projects: React.FC = () => {
   const { workspaceId } = useParams<{ workspaceId: string }>();
   const [projects, setProjects] = useState<Project[]>([]);
+  // Link to the next page of projects, loaded through "Load more".
+  const [next, setNext] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const [showCreateModal, setShowCreateModal] = useState(false);
   const [newProject, setNewProject] = useState({ name: '', description: '' });
@@ -18,8 +20,9 @@ const Projects: React.FC = () => {
 
   const loadProjects = async () => {
     try {
-      const data = await projectApi.getAll(Number(workspaceId));
-      setProjects(data);
+      const page = await projectApi.getPage(Number(workspaceId));
+      setProjects(page.results);
+      setNext(page.next);
     } catch (error) {
       console.error('Failed to load projects:', error);
     } finally {
@@ -27,6 +30,17 @@ const Projects: React.FC = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!next) return;
+    try {
+      const page = await projectApi.getPage(Number(workspaceId), next);
+      setProjects((current) => [...current, ...page.results]);
+      setNext(page.next);
+    } catch (error) {
+      console.error('Failed to load projects:', error);
+    }
+  };
+
   const handleCreate = async (e: React.FormEvent) => {
     e.preventDefault();
     try {
@@ -71,6 +85,14 @@ const Projects: React.FC = () => {
         ))}
       </div>
 
+      {next && (
+        <div className="projects-load-more">
+          <button className="btn-secondary" onClick={loadMore}>
+            Load more
+          </button>
+        </div>
+      )}
+
       {showCreateModal && (
         <div className="modal-overlay" onClick={() => setShowCreateModal(false)}>
           <div className="modal" onClick={(e) => e.stopPropagation()}>
@@ -5,9 +5,15 @@ import { workspaceApi } from '../api/workspaces';
 import type { Task, WorkspaceMember } from '../types';
 import '../styles/Tasks.css';
 
+// The loaded part of one board column; `next` links to the rest.
+interface Column {
+  tasks: Task[];
+  next: string | null;
+}
+
 const Tasks: React.FC = () => {
   const { workspaceId, projectId } = useParams<{ workspaceId: string; projectId: string }>();
-  const [tasks, setTasks] = useState<Task[]>([]);
+  const [columns, setColumns] = useState<Record<string, Column>>({});
   const [members, setMembers] = useState<WorkspaceMember[]>([]);
   const [loading, setLoading] = useState(true);
   const [showCreateModal, setShowCreateModal] = useState(false);
@@ -26,13 +32,19 @@ const Tasks: React.FC = () => {
     loadData();
   }, [projectId, workspaceId]);
 
+  // Each column loads its first page; the rest come in through "Load more".
+  const loadColumn = async (status: string): Promise<Column> => {
+    const page = await taskApi.getPage({ project: Number(projectId), status });
+    return { tasks: page.results, next: page.next };
+  };
+
   const loadData = async () => {
     try {
-      const [tasksData, membersData] = await Promise.all([
-        taskApi.getAll(Number(projectId)),
+      const [columnsData, membersData] = await Promise.all([
+        Promise.all(statuses.map(loadColumn)),
         workspaceApi.getMembers(Number(workspaceId)),
       ]);
-      setTasks(tasksData);
+      setColumns(Object.fromEntries(statuses.map((status, i) => [status, columnsData[i]])));
       setMembers(membersData);
     } catch (error) {
       console.error('Failed to load data:', error);
@@ -41,15 +53,37 @@ const Tasks: React.FC = () => {
     }
   };
 
-  const loadTasks = async () => {
+  const reloadColumn = async (status: string) => {
     try {
-      const data = await taskApi.getAll(Number(projectId));
-      setTasks(data);
+      const column = await loadColumn(status);
+      setColumns((current) => ({ ...current, [status]: column }));
     } catch (error) {
       console.error('Failed to load tasks:', error);
     }
   };
 
+  const loadMore = async (status: string) => {
+    const next = columns[status]?.next;
+    if (!next) return;
+    try {
+      const page = await taskApi.getPage({ project: Number(projectId), status }, next);
+      setColumns((current) => ({
+        ...current,
+        [status]: { tasks: [...current[status].tasks, ...page.results], next: page.next },
+      }));
+    } catch (error) {
+      console.error('Failed to load tasks:', error);
+    }
+  };
+
+  const removeTask = (current: Record<string, Column>, taskId: number) =>
+    Object.fromEntries(
+      Object.entries(current).map(([status, column]) => [
+        status,
+        { ...column, tasks: column.tasks.filter((task) => task.id !== taskId) },
+      ])
+    );
+
   const handleCreate = async (e: React.FormEvent) => {
     e.preventDefault();
     try {
@@ -71,7 +105,7 @@ const Tasks: React.FC = () => {
       await taskApi.create(taskData);
       setShowCreateModal(false);
       setNewTask({ title: '', description: '', status: 'todo', assigned_to: undefined, due_date: '' });
-      loadTasks();
+      reloadColumn(taskData.status);
     } catch (error) {
       console.error('Failed to create task:', error);
     }
@@ -79,8 +113,16 @@ const Tasks: React.FC = () => {
 
   const handleStatusChange = async (taskId: number, newStatus: string) => {
     try {
-      await taskApi.update(taskId, { status: newStatus as any });
-      loadTasks();
+      const task = await taskApi.update(taskId, { status: newStatus as any });
+      setColumns((current) => {
+        const updated = removeTask(current, taskId);
+        // The task goes to the end of its new column; show it once that end is loaded.
+        const target = updated[task.status];
+        if (target && !target.next) {
+          updated[task.status] = { ...target, tasks: [...target.tasks, task] };
+        }
+        return updated;
+      });
     } catch (error) {
       console.error('Failed to update task:', error);
     }
@@ -90,7 +132,7 @@ const Tasks: React.FC = () => {
     if (window.confirm('Are you sure you want to delete this task?')) {
       try {
         await taskApi.delete(taskId);
-        loadTasks();
+        setColumns((current) => removeTask(current, taskId));
       } catch (error) {
         console.error('Failed to delete task:', error);
       }
@@ -98,7 +140,7 @@ const Tasks: React.FC = () => {
   };
 
   const getTasksByStatus = (status: string) => {
-    return tasks.filter((task) => task.status === status);
+    return columns[status]?.tasks ?? [];
   };
 
   const formatStatusLabel = (status: string) => {
@@ -126,7 +168,10 @@ const Tasks: React.FC = () => {
           <div key={status} className="kanban-column">
             <div className="kanban-column-header">
               <h3>{formatStatusLabel(status)}</h3>
-              <span className="task-count">{getTasksByStatus(status).length}</span>
+              <span className="task-count">
+                {getTasksByStatus(status).length}
+                {columns[status]?.next ? '+' : ''}
+              </span>
             </div>
             <div className="kanban-column-content">
               {getTasksByStatus(status).map((task) => (
@@ -162,6 +207,11 @@ const Tasks: React.FC = () => {
                   </div>
                 </div>
               ))}
+              {columns[status]?.next && (
+                <button className="btn-secondary" onClick={() => loadMore(status)}>
+                  Load more
+                </button>
+              )}
             </div>
           </div>
         ))}
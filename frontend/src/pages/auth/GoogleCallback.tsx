@@ -12,12 +12,13 @@ const GoogleCallback: React.FC = () => {
     const processCallback = async () => {
       try {
         const searchParams = new URLSearchParams(window.location.search);
-        const { token } = await handleOAuthCallback('google', searchParams);
+        const { token, id_token } = await handleOAuthCallback('google', searchParams);
 
-        if (token) {
+        if (token || id_token) {
           const response = await authApi.socialLogin({
             provider: 'google',
             token,
+            id_token,
           });
 
           localStorage.setItem('access_token', response.access);
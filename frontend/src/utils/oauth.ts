@@ -1,3 +1,5 @@
+import { authApi } from '../api/auth';
+
 export const OAUTH_CONFIG = {
   google: {
     clientId: import.meta.env.VITE_GOOGLE_CLIENT_ID || '',
@@ -13,7 +15,7 @@ export const OAUTH_CONFIG = {
   },
 };
 
-export const initiateOAuthLogin = (provider: 'google' | 'github') => {
+export const initiateOAuthLogin = async (provider: 'google' | 'github') => {
   const config = OAUTH_CONFIG[provider];
   
   if (!config.clientId) {
@@ -26,11 +28,14 @@ export const initiateOAuthLogin = (provider: 'google' | 'github') => {
     client_id: config.clientId,
     redirect_uri: config.redirectUri,
     scope: config.scope,
-    response_type: provider === 'google' ? 'token' : 'code',
+    // Google also returns an ID token, which the backend verifies locally.
+    response_type: provider === 'google' ? 'token id_token' : 'code',
   });
 
   if (provider === 'google') {
     params.append('include_granted_scopes', 'true');
+    // Issued by the backend, which keeps it in a cookie and accepts it once.
+    params.append('nonce', await authApi.socialNonce());
   }
 
   const authUrl = `${config.authUrl}?${params.toString()}`;
@@ -45,12 +50,16 @@ export const handleOAuthCallback = async (
     // Google returns token in hash fragment
     const hashParams = new URLSearchParams(window.location.hash.substring(1));
     const accessToken = hashParams.get('access_token');
+    const idToken = hashParams.get('id_token');
     
-    if (!accessToken) {
+    if (!accessToken && !idToken) {
       throw new Error('No access token received from Google');
     }
     
-    return { token: accessToken };
+    return {
+      token: accessToken ?? undefined,
+      id_token: idToken ?? undefined,
+    };
   } else if (provider === 'github') {
     // GitHub returns code in query params
     const code = searchParams.get('code');